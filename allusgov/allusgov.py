@@ -1,17 +1,22 @@
 """allusgov library API."""
 
+import logging
 import os
 import sys
-from typing import Dict, List, Optional, cast
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, cast
 
+import polars as pl
 from bigtree import Node, levelorder_iter
 from scrapy import signals
 from scrapy.crawler import CrawlerProcess
 
 from . import settings
 from .cli_options import logger
-from .merger import merger
-from .utils.utils import scrapy_settings, scrapy_spider_closed
+from .exporter.exporter import ExportManifest, ExportSession
+from .merger import merger, similarity, state
+from .utils.utils import LogRecordCollector, scrapy_settings, scrapy_spider_closed
 
 
 def spider(sources: List[str], spider_page_limit: int, cache_dir: str):
@@ -36,31 +41,271 @@ def spider(sources: List[str], spider_page_limit: int, cache_dir: str):
             sys.exit(10)
 
 
-def build(sources: List[str], exporters: List[str], to_export: bool) -> Dict[str, Node]:
-    trees = {}
-    for source in sources:
-        logger.info("Constructing the %s tree...", source)
-        importer = settings.SOURCES[source]["importer"](
-            logger=logger, source_name=source, data_dir=settings.DATA_DIR
+def export_worker(
+    source: str,
+    tree: Node,
+    exporter: str,
+    session: ExportSession,
+    manifest: ExportManifest,
+    key: str,
+    compression: str = "none",
+) -> float:
+    """Export a tree with a single exporter, returning the time taken in seconds."""
+    start = time.perf_counter()
+    instance = settings.EXPORTERS[exporter](
+        logger=logger,
+        source=source,
+        tree=tree,
+        data_dir=settings.DATA_DIR,
+        session=session,
+        compression=compression,
+    )
+    try:
+        instance.export()
+    except BaseException:
+        instance.discard()
+        raise
+    for file in manifest.record(exporter, key, instance.commit(manifest)):
+        path = settings.DATA_DIR + "/" + source + "/" + file
+        if os.path.exists(path):
+            os.remove(path)
+    return time.perf_counter() - start
+
+
+def export(
+    source: str,
+    tree: Node,
+    exporters: List[str],
+    jobs: int = 1,
+    compression: str = "none",
+) -> None:
+    """
+    Export a tree with each of the given exporters, flattening it only once.
+
+    Exporters that last ran on the same tree with the same code, according to the manifest
+    of the source directory, are skipped. Each file is written to a temporary file and only
+    renamed over the output file if its contents changed.
+
+    With more than one job, the exporters run in threads sharing the flattened tree, which is
+    read-only while exporting. The time taken by each exporter is logged at the end.
+
+    Output files are compressed with the given compression, as they are written.
+    """
+    start = time.perf_counter()
+    session = ExportSession(tree)
+    manifest = ExportManifest(settings.DATA_DIR, source)
+    tree_hash = session.tree_fingerprint()
+    keys = {
+        exporter: ExportManifest.key(
+            tree_hash, exporter, settings.EXPORTERS[exporter], compression
         )
-        trees[source] = importer.build()
-        if to_export:
-            for exporter in exporters:
-                settings.EXPORTERS[exporter](
-                    logger=logger,
-                    source=source,
-                    tree=trees[source],
-                    data_dir=settings.DATA_DIR,
-                ).export()
-        # Run post-build processors
-        for processor_class in settings.POST_BUILD_PROCESSORS:
-            processor = processor_class(logger, source, data_dir=settings.DATA_DIR)
-            for org in levelorder_iter(trees[source]):
-                org = cast(Node, org)
-                processor.process(org)
+        for exporter in exporters
+    }
+    skipped = [
+        exporter
+        for exporter in exporters
+        if manifest.is_current(exporter, keys[exporter])
+    ]
+    pending = [exporter for exporter in exporters if exporter not in skipped]
+    if jobs == 1 or len(pending) <= 1:
+        timings = [
+            export_worker(
+                source, tree, exporter, session, manifest, keys[exporter], compression
+            )
+            for exporter in pending
+        ]
+    else:
+        with ThreadPoolExecutor(max_workers=jobs or None) as executor:
+            futures = [
+                executor.submit(
+                    export_worker,
+                    source,
+                    tree,
+                    exporter,
+                    session,
+                    manifest,
+                    keys[exporter],
+                    compression,
+                )
+                for exporter in pending
+            ]
+            timings = [future.result() for future in futures]
+    manifest.save()
+    logger.info(
+        "Exported the %s tree in %.2fs: %s",
+        source,
+        time.perf_counter() - start,
+        ", ".join(
+            [f"{exporter} {timing:.2f}s" for exporter, timing in zip(pending, timings)]
+            + [f"{exporter} unchanged" for exporter in skipped]
+        ),
+    )
+
+
+def build_source(
+    source: str,
+    exporters: List[str],
+    to_export: bool,
+    export_jobs: int = 1,
+    export_compression: str = "none",
+) -> Node:
+    """Build a tree for a single source, export it and run the post-build processors."""
+    logger.info("Constructing the %s tree...", source)
+    importer = settings.SOURCES[source]["importer"](
+        logger=logger, source_name=source, data_dir=settings.DATA_DIR
+    )
+    tree = importer.build()
+    if to_export:
+        export(source, tree, exporters, export_jobs, export_compression)
+    # Run post-build processors
+    for processor_class in settings.POST_BUILD_PROCESSORS:
+        processor = processor_class(logger, source, data_dir=settings.DATA_DIR)
+        for org in levelorder_iter(tree):
+            org = cast(Node, org)
+            processor.process(org)
+    return tree
+
+
+def build_source_worker(
+    source: str,
+    exporters: List[str],
+    to_export: bool,
+    data_dir: str,
+    log_level: int,
+    export_jobs: int = 1,
+    export_compression: str = "none",
+) -> Tuple[Node, List[logging.LogRecord]]:
+    """Build a single source in a worker process, collecting log records for the parent to replay."""
+    settings.DATA_DIR = data_dir
+    handler = LogRecordCollector()
+    logger.handlers = [handler]
+    logger.setLevel(log_level)
+    tree = build_source(source, exporters, to_export, export_jobs, export_compression)
+    return tree, handler.records
+
+
+def build(
+    sources: List[str],
+    exporters: List[str],
+    to_export: bool,
+    jobs: int = 1,
+    export_jobs: int = 1,
+    export_compression: str = "none",
+) -> Dict[str, Node]:
+    """Build a tree for each of the given sources and optionally export each source."""
+    trees = {}
+    if jobs == 1 or len(sources) <= 1:
+        for source in sources:
+            trees[source] = build_source(
+                source, exporters, to_export, export_jobs, export_compression
+            )
+        return trees
+
+    with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+        futures = {
+            source: executor.submit(
+                build_source_worker,
+                source,
+                list(exporters),
+                to_export,
+                settings.DATA_DIR,
+                logger.getEffectiveLevel(),
+                export_jobs,
+                export_compression,
+            )
+            for source in sources
+        }
+        # Collect results in source order, so that the log output and tree order match a serial run.
+        for source, future in futures.items():
+            trees[source], records = future.result()
+            for record in records:
+                logger.handle(record)
     return trees
 
 
+def score_source_worker(
+    source_names: List[str],
+    base_names: List[str],
+    threshold: int,
+    cache: Optional[similarity.SimilarityCache],
+    blocking: Optional[str],
+    blocking_fallback: bool,
+    memory_limit: Optional[int],
+    matcher: str,
+    log_level: int,
+) -> Tuple[similarity.Similarity, List[logging.LogRecord]]:
+    """Score a single source against the base names in a worker process, collecting log records."""
+    handler = LogRecordCollector()
+    logger.handlers = [handler]
+    logger.setLevel(log_level)
+    source_similarity = merger.Merger.source_similarity(
+        source_names,
+        base_names,
+        threshold,
+        cache,
+        blocking,
+        blocking_fallback,
+        memory_limit,
+        settings.MATCHERS[matcher],
+    )
+    # Names with a full set of exact matches are always resolved by the exact-match fast path.
+    source_similarity.calculate(
+        [
+            row
+            for row, name in enumerate(source_names)
+            if len(source_similarity.exact_matches(name)) < source_similarity.limit
+        ]
+    )
+    return source_similarity, handler.records
+
+
+def score_sources(
+    tree: Dict[str, Node],
+    sources: List[str],
+    merge_base: str,
+    threshold: int,
+    jobs: int,
+    cache: Optional[similarity.SimilarityCache] = None,
+    blocking: Optional[str] = None,
+    blocking_fallback: bool = True,
+    memory_limit: Optional[int] = None,
+    matcher: str = "ratio",
+    name_field: str = "name",
+) -> Dict[str, similarity.Similarity]:
+    """
+    Score every source against the base tree as built, in parallel.
+
+    The base tree only grows during a merge, so each merge then only has to score its source
+    against the names that earlier merges added to the base tree.
+    """
+    base = tree[merge_base]
+    base_names = list(merger.Merger.name_list(base, merge_base, name_field).keys())
+    scores = {}
+    logger.info("Calculating string similarity for all sources in parallel...")
+    with ProcessPoolExecutor(max_workers=jobs or None) as executor:
+        futures = {
+            source: executor.submit(
+                score_source_worker,
+                list(merger.Merger.name_list(tree[source], source, name_field).keys()),
+                base_names,
+                threshold,
+                cache,
+                blocking,
+                blocking_fallback,
+                memory_limit,
+                matcher,
+                logger.getEffectiveLevel(),
+            )
+            for source in sources
+            if source != merge_base
+        }
+        for source, future in futures.items():
+            scores[source], records = future.result()
+            for record in records:
+                logger.handle(record)
+    return scores
+
+
 def merge(
     sources: List[str],
     merge_base: str,
@@ -68,9 +313,32 @@ def merge(
     exporters: List[str],
     to_export: bool,
     tree: Optional[Dict[str, Node]] = None,
+    jobs: int = 1,
+    merge_cache: bool = True,
+    threshold_sweep: Optional[List[int]] = None,
+    merge_blocking: Optional[str] = None,
+    merge_blocking_fallback: bool = True,
+    merge_strategy: str = "flat",
+    merge_incremental: bool = True,
+    merge_memory_limit: Optional[int] = None,
+    matcher: str = "ratio",
+    merge_normalized_names: bool = False,
+    plan_only: bool = False,
+    apply_plan: Optional[str] = None,
+    export_jobs: int = 1,
+    export_compression: str = "none",
 ):
     """Merge all data into a single tree using fuzzy string matching."""
     os.makedirs(settings.DATA_DIR + "/merged", exist_ok=True)
+    cache = None
+    if merge_cache:
+        cache = similarity.SimilarityCache(
+            logger,
+            settings.DATA_DIR + "/" + settings.SIMILARITY_CACHE_DIR,
+            settings.SIMILARITY_CACHE_SIZE,
+            # Planning only reads the caches, so that it leaves no trace of the plan.
+            read_only=plan_only,
+        )
     if not tree:
         # If called directly, build the tree (without exporting)
         tree = cast(
@@ -79,29 +347,219 @@ def merge(
                 sources=sources,
                 exporters=exporters,
                 to_export=False,
+                jobs=jobs,
             ),
         )
+    name_field = "normalized_name" if merge_normalized_names else "name"
+    # Names are processed once for all merges, as each merge is against the same growing base.
+    processed_names = similarity.ProcessedNames(settings.MATCHERS[matcher])
+    if threshold_sweep:
+        return sweep(
+            tree,
+            sources,
+            merge_base,
+            threshold_sweep,
+            cache,
+            merge_blocking,
+            merge_blocking_fallback,
+            merge_memory_limit,
+            matcher,
+            name_field,
+            processed_names,
+            merge_strategy,
+        )
     base = tree[merge_base]
-    for source in sources:
-        if source == merge_base:
-            continue
+    merge_sources = [source for source in sources if source != merge_base]
+    # Each merge depends on the trees merged before it, so fingerprint them all before merging.
+    merge_state = state.MergeState(
+        logger, settings.DATA_DIR + "/" + settings.MERGE_STATE_DIR
+    )
+    keys = dict(
+        zip(
+            merge_sources,
+            merge_state.keys(
+                [base] + [tree[source] for source in merge_sources],
+                [merge_base] + merge_sources,
+                [
+                    merge_strategy,
+                    str(merge_threshold),
+                    str(merge_blocking),
+                    str(merge_blocking_fallback),
+                    matcher,
+                    name_field,
+                ],
+            ),
+        )
+    )
+    stored: Dict[str, pl.DataFrame] = {}
+    if apply_plan:
+        stored = load_plan(apply_plan, keys)
+    elif merge_incremental:
+        for source in merge_sources:
+            decisions = merge_state.load(source, keys[source])
+            if decisions is not None:
+                stored[source] = decisions
+    scores: Dict[str, similarity.Similarity] = {}
+    if jobs != 1 and merge_strategy == "flat":
+        # The hierarchical strategy scores most names within subtrees, so it is left to score as it merges.
+        scores = score_sources(
+            tree,
+            [source for source in merge_sources if source not in stored],
+            merge_base,
+            merge_threshold,
+            jobs,
+            cache,
+            merge_blocking,
+            merge_blocking_fallback,
+            merge_memory_limit,
+            matcher,
+            name_field,
+        )
+    plans: List[pl.DataFrame] = []
+    for source in merge_sources:
         logger.info("Merging in the %s tree...", source)
-        base = merger.Merger(
+        source_merger = settings.MERGE_STRATEGIES[merge_strategy](
             logger=logger,
             base_tree=base,
             base_name=merge_base,
             source_tree=tree[source],
             source_name=source,
             threshold=merge_threshold,
-        ).merge()
+            cache=cache,
+            blocking=merge_blocking,
+            blocking_fallback=merge_blocking_fallback,
+            similarity=scores.get(source),
+            memory_limit=merge_memory_limit,
+            matcher=settings.MATCHERS[matcher],
+            name_field=name_field,
+            processed_names=processed_names,
+        )
+        if source in stored:
+            base = source_merger.replay(stored[source])
+            if plan_only:
+                plans.append(plan_table(source, keys[source], source_merger))
+        else:
+            plan = source_merger.plan()
+            if plan_only:
+                plans.append(plan_table(source, keys[source], source_merger, plan))
+            else:
+                merge_state.save(
+                    source, keys[source], source_merger.decision_table(plan)
+                )
+            # Later sources are merged against this merge, so the plan is still applied in memory.
+            source_merger.apply_all(plan)
+            base = source_merger.base_tree
+    if plan_only:
+        plan_path = settings.DATA_DIR + "/" + settings.MERGE_PLAN
+        logger.info("Saving the merge plan to %s...", plan_path)
+        pl.concat(plans).write_parquet(plan_path)
+        return base
     if to_export:
-        for exporter in exporters:
-            settings.EXPORTERS[exporter](
-                logger=logger, source="merged", tree=base, data_dir=settings.DATA_DIR
-            ).export()
+        export("merged", base, exporters, export_jobs, export_compression)
     return base
 
 
+def plan_table(
+    source: str,
+    key: str,
+    source_merger: merger.Merger,
+    plan: Optional[List[Tuple[Node, Node, float]]] = None,
+) -> pl.DataFrame:
+    """Return the decisions of a merge as a merge plan table, with the source and merge key."""
+    return source_merger.decision_table(plan).select(
+        pl.lit(source).alias("source"), pl.lit(key).alias("key"), pl.all()
+    )
+
+
+def load_plan(path: str, keys: Dict[str, str]) -> Dict[str, pl.DataFrame]:
+    """
+    Load the decisions for each source from a merge plan.
+
+    The plan must have been made for the same trees and merge settings.
+
+    Args:
+        path (str): Path to the merge plan.
+        keys (dict): Merge key of each source.
+
+    Returns:
+        dict: Decisions for each source, in order.
+    """
+    logger.info("Loading the merge plan from %s...", path)
+    plan = pl.read_parquet(path)
+    plan_keys = dict(plan.select("source", "key").unique().iter_rows())
+    for source, key in keys.items():
+        if plan_keys.get(source) != key:
+            logger.error(
+                "Merge plan %s was not made for the current %s tree and merge settings",
+                path,
+                source,
+            )
+            sys.exit(11)
+    return {
+        source: plan.filter(pl.col("source") == source).drop("source", "key")
+        for source in keys
+    }
+
+
+def sweep(
+    tree: Dict[str, Node],
+    sources: List[str],
+    merge_base: str,
+    thresholds: List[int],
+    cache: Optional[similarity.SimilarityCache] = None,
+    blocking: Optional[str] = None,
+    blocking_fallback: bool = True,
+    memory_limit: Optional[int] = None,
+    matcher: str = "ratio",
+    name_field: str = "name",
+    processed_names: Optional[similarity.ProcessedNames] = None,
+    merge_strategy: str = "flat",
+) -> pl.DataFrame:
+    """
+    Report merge decisions and merged node counts for a range of thresholds.
+
+    Each source is swept with the merge strategy against the base tree as built, without
+    merging, so the counts for later sources do not include nodes added by earlier merges.
+    """
+    base = tree[merge_base]
+    base_nodes = len(list(levelorder_iter(base)))
+    decisions = []
+    summaries = []
+    for source in sources:
+        if source == merge_base:
+            continue
+        start = time.perf_counter()
+        source_decisions, source_summary = settings.MERGE_STRATEGIES[merge_strategy](
+            logger=logger,
+            base_tree=base,
+            base_name=merge_base,
+            source_tree=tree[source],
+            source_name=source,
+            threshold=min(thresholds),
+            cache=cache,
+            blocking=blocking,
+            blocking_fallback=blocking_fallback,
+            memory_limit=memory_limit,
+            matcher=settings.MATCHERS[matcher],
+            name_field=name_field,
+            processed_names=processed_names,
+        ).sweep(thresholds)
+        decisions.append(source_decisions)
+        summaries.append(
+            source_summary.with_columns(seconds=pl.lit(time.perf_counter() - start))
+        )
+    summary = pl.concat(summaries).with_columns(
+        merged_nodes=pl.col("nodes_added").cum_sum().over("threshold") + base_nodes
+    )
+    summary_path = settings.DATA_DIR + "/merged/threshold-sweep.csv"
+    decisions_path = settings.DATA_DIR + "/merged/threshold-sweep-decisions.parquet"
+    logger.info("Saving the threshold sweep summary to %s...", summary_path)
+    summary.sort(["threshold"], maintain_order=True).write_csv(summary_path)
+    logger.info("Saving the threshold sweep decisions to %s...", decisions_path)
+    pl.concat(decisions).write_parquet(decisions_path)
+    return summary
+
+
 def all_steps(
     sources: List[str],
     spider_page_limit: int,
@@ -112,6 +570,17 @@ def all_steps(
     to_spider: bool,
     to_export: bool,
     to_merge: bool,
+    jobs: int = 1,
+    merge_cache: bool = True,
+    merge_blocking: Optional[str] = None,
+    merge_blocking_fallback: bool = True,
+    merge_strategy: str = "flat",
+    merge_incremental: bool = True,
+    merge_memory_limit: Optional[int] = None,
+    matcher: str = "ratio",
+    merge_normalized_names: bool = False,
+    export_jobs: int = 1,
+    export_compression: str = "none",
 ):
     """Execute all steps in order: spider, export, and merge."""
     if to_spider:
@@ -128,6 +597,9 @@ def all_steps(
             sources=sources,
             exporters=exporters,
             to_export=to_export,
+            jobs=jobs,
+            export_jobs=export_jobs,
+            export_compression=export_compression,
         )
 
     if to_merge:
@@ -139,5 +611,16 @@ def all_steps(
             merge_threshold=merge_threshold,
             exporters=exporters,
             to_export=to_export,
+            jobs=jobs,
+            merge_cache=merge_cache,
+            merge_blocking=merge_blocking,
+            merge_blocking_fallback=merge_blocking_fallback,
+            merge_strategy=merge_strategy,
+            merge_incremental=merge_incremental,
+            merge_memory_limit=merge_memory_limit,
+            matcher=matcher,
+            merge_normalized_names=merge_normalized_names,
+            export_jobs=export_jobs,
+            export_compression=export_compression,
         )
     return (base, trees)
@@ -13,6 +13,7 @@ from .cli_options import (
     merge_options,
     sources_options,
     spider_options,
+    threshold_range,
 )
 from .dev import dev
 
@@ -44,25 +45,88 @@ def spider(sources: List[str], spider_page_limit: int, cache_dir: str):
 @main.command()
 @sources_options
 @build_options
-def build(sources: List[str], exporters: List[str], to_export: bool) -> Dict[str, Node]:
+def build(
+    sources: List[str],
+    exporters: List[str],
+    to_export: bool,
+    jobs: int,
+    export_jobs: int,
+    export_compression: str,
+) -> Dict[str, Node]:
     """Build a tree for each of the given sources and optionally export each source."""
-    return allusgov.build(sources, exporters, to_export)
+    return allusgov.build(
+        sources, exporters, to_export, jobs, export_jobs, export_compression
+    )
 
 
 @main.command()
 @sources_options
 @merge_options
 @build_options
+@click.option(
+    "--threshold-sweep",
+    default=None,
+    callback=threshold_range,
+    metavar="START:STOP:STEP",
+    help="Report merge decisions for each threshold in the range, instead of merging",
+)
+@click.option(
+    "--plan-only",
+    is_flag=True,
+    default=False,
+    help="Only save the merge decisions to a merge plan, without exporting or updating caches",
+)
+@click.option(
+    "--apply-plan",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Apply the decisions in a merge plan instead of calculating string similarity",
+)
 def merge(
     sources: List[str],
     merge_base: str,
     merge_threshold: int,
+    merge_cache: bool,
+    merge_blocking: Optional[str],
+    merge_blocking_fallback: bool,
+    merge_strategy: str,
+    merge_incremental: bool,
+    merge_memory_limit: Optional[int],
+    matcher: str,
+    merge_normalized_names: bool,
     exporters: List[str],
     to_export: bool,
+    jobs: int,
+    export_jobs: int,
+    export_compression: str,
+    threshold_sweep: Optional[List[int]],
+    plan_only: bool,
+    apply_plan: Optional[str],
     tree: Optional[Dict[str, Node]] = None,
 ):
     """Merge all data into a single tree using fuzzy string matching."""
-    allusgov.merge(sources, merge_base, merge_threshold, exporters, to_export, tree)
+    allusgov.merge(
+        sources,
+        merge_base,
+        merge_threshold,
+        exporters,
+        to_export,
+        tree,
+        jobs,
+        merge_cache,
+        threshold_sweep,
+        merge_blocking,
+        merge_blocking_fallback,
+        merge_strategy,
+        merge_incremental,
+        merge_memory_limit,
+        matcher,
+        merge_normalized_names,
+        plan_only,
+        apply_plan,
+        export_jobs,
+        export_compression,
+    )
 
 
 @main.command(name="all")
@@ -91,9 +155,20 @@ def all_steps(
     exporters: List[str],
     merge_base: str,
     merge_threshold: int,
+    merge_cache: bool,
+    merge_blocking: Optional[str],
+    merge_blocking_fallback: bool,
+    merge_strategy: str,
+    merge_incremental: bool,
+    merge_memory_limit: Optional[int],
+    matcher: str,
+    merge_normalized_names: bool,
     to_spider: bool,
     to_export: bool,
     to_merge: bool,
+    jobs: int,
+    export_jobs: int,
+    export_compression: str,
 ):
     """Execute all steps in order: spider, export, and merge."""
     allusgov.all_steps(
@@ -106,6 +181,17 @@ def all_steps(
         to_spider,
         to_export,
         to_merge,
+        jobs,
+        merge_cache,
+        merge_blocking,
+        merge_blocking_fallback,
+        merge_strategy,
+        merge_incremental,
+        merge_memory_limit,
+        matcher,
+        merge_normalized_names,
+        export_jobs,
+        export_compression,
     )
 
 
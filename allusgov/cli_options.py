@@ -6,6 +6,7 @@ import click
 import click_log
 
 from . import settings
+from .merger.blocking import BLOCKING_MODES
 
 logger = logging.getLogger(__name__)
 click_log.basic_config(logger)
@@ -69,6 +70,28 @@ def build_options(func):
         multiple=True,
         help="Specify exporters to use",
     )(func)
+    func = click.option(
+        "--jobs",
+        "-j",
+        default=1,
+        type=click.IntRange(min=0),
+        help="Number of sources to build, and score for merging, in parallel, "
+        + "0 for one per CPU (default: 1)",
+    )(func)
+    func = click.option(
+        "--export-jobs",
+        default=1,
+        type=click.IntRange(min=0),
+        help="Number of exporters to run in parallel threads for each tree, "
+        + "0 for one per CPU (default: 1)",
+    )(func)
+    func = click.option(
+        "--export-compression",
+        default="none",
+        type=click.Choice(settings.EXPORT_COMPRESSIONS),
+        help="Compress exported files as they are written; Parquet files use it "
+        + "as their internal compression (default: none)",
+    )(func)
     return func
 
 
@@ -85,9 +108,93 @@ def merge_options(func):
         type=click.IntRange(min=0, max=100),
         help="Threshold for fuzzy string matching when merging (0-100)",
     )(func)
+    func = click.option(
+        "--merge-cache/--no-merge-cache",
+        default=True,
+        help="Enable/disable the on-disk string similarity cache (default: True)",
+    )(func)
+    func = click.option(
+        "--merge-normalized-names/--no-merge-normalized-names",
+        default=False,
+        help="Match on the normalized names of organizations, rather than their raw names "
+        + "(default: False)",
+    )(func)
+    func = click.option(
+        "--matcher",
+        default="ratio",
+        type=click.Choice(list(settings.MATCHERS.keys())),
+        help="String matcher used to score names when merging (default: ratio)",
+    )(func)
+    func = click.option(
+        "--merge-memory-limit",
+        default=None,
+        callback=byte_size,
+        metavar="SIZE",
+        help="Limit the memory used for string similarity, spilling candidates to disk "
+        + "if needed, e.g. 512M or 4G (default: no limit)",
+    )(func)
+    func = click.option(
+        "--merge-incremental/--no-merge-incremental",
+        default=True,
+        help="Enable/disable replaying stored decisions for merges whose inputs are unchanged "
+        + "(default: True)",
+    )(func)
+    func = click.option(
+        "--merge-strategy",
+        default="flat",
+        type=click.Choice(list(settings.MERGE_STRATEGIES.keys())),
+        help="Match each org against the whole base tree (flat), or top down "
+        + "within the subtrees of matched parents (hierarchical) (default: flat)",
+    )(func)
+    func = click.option(
+        "--merge-blocking",
+        default="none",
+        type=click.Choice(["none"] + BLOCKING_MODES),
+        callback=lambda ctx, param, value: None if value == "none" else value,
+        help="Only score name pairs sharing a token or character trigram (default: none)",
+    )(func)
+    func = click.option(
+        "--merge-blocking-fallback/--no-merge-blocking-fallback",
+        default=True,
+        help="Score all base names for names that share no blocking key (default: True)",
+    )(func)
     return func
 
 
+def threshold_range(ctx, param, value):
+    """Parse a START:STOP:STEP threshold range, including STOP."""
+    if value is None:
+        return None
+    try:
+        start, stop, step = (int(part) for part in value.split(":"))
+    except ValueError as e:
+        raise click.BadParameter("must be in the form START:STOP:STEP") from e
+    if not 0 <= start <= stop <= 100 or step < 1:
+        raise click.BadParameter(
+            "must be within 0-100, with START <= STOP and a positive STEP"
+        )
+    return list(range(start, stop + 1, step))
+
+
+def byte_size(ctx, param, value):
+    """Parse a size in bytes, with an optional K, M or G suffix."""
+    if value is None:
+        return None
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    value = value.strip().upper().removesuffix("B")
+    multiplier = 1
+    if value[-1:] in units:
+        multiplier = units[value[-1]]
+        value = value[:-1]
+    try:
+        size = int(float(value) * multiplier)
+    except ValueError as e:
+        raise click.BadParameter("must be a size such as 512M or 4G") from e
+    if size <= 0:
+        raise click.BadParameter("must be positive")
+    return size
+
+
 class CustomGroup(click.Group):
     def list_commands(self, ctx):
         # List the top level commands in a more helpful order.
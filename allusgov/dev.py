@@ -1,5 +1,9 @@
 import json
+import os
 import re
+import tempfile
+import time
+import tracemalloc
 from typing import Any, Dict, List, cast
 
 import click
@@ -8,7 +12,10 @@ from bigtree import Node, levelorder_iter
 from scrapy.crawler import CrawlerProcess
 
 from . import allusgov, settings
-from .cli_options import logger, spider_options
+from .cli_options import logger, sources_options, spider_options
+from .exporter.exporter import ExportSession
+from .importer.synthetic_importer import SyntheticImporter
+from .merger.merger import Merger
 from .spider.acronyms import DoDAcronymsSpider, GovSpeakAcronymsSpider
 from .utils.utils import scrapy_settings
 
@@ -224,6 +231,184 @@ def acronyms_load_library(acronyms: Dict[str, Any]) -> Dict[str, Any]:
     return acronym_library
 
 
+@dev.command()
+@click.option(
+    "--size",
+    "sizes",
+    default=[10000, 100000, 1000000],
+    multiple=True,
+    type=int,
+    help="Number of synthetic nodes to build (may be repeated)",
+)
+@click.option(
+    "--chain-size",
+    "chain_sizes",
+    default=[10000, 100000],
+    multiple=True,
+    type=int,
+    help="Number of synthetic nodes to build as a single deep chain (may be repeated)",
+)
+def build_benchmark(sizes: List[int], chain_sizes: List[int]):
+    """Benchmark tree construction against synthetic sources of increasing size and depth."""
+    for size, chain in [(size, False) for size in sizes] + [
+        (size, True) for size in chain_sizes
+    ]:
+        importer = SyntheticImporter(logger, size, chain=chain)
+        start = time.perf_counter()
+        tree = importer.build()
+        elapsed = time.perf_counter() - start
+        # Count iteratively, as bigtree's own traversals recurse and cannot walk a deep chain.
+        nodes = 0
+        depth = 0
+        stack = [(tree, 1)]
+        while stack:
+            node, node_depth = stack.pop()
+            nodes += 1
+            depth = max(depth, node_depth)
+            stack.extend((child, node_depth + 1) for child in node.children)
+        logger.info(
+            "Built %d nodes, %d deep, in %.2fs (%.2f µs per node)",
+            nodes,
+            depth,
+            elapsed,
+            elapsed / size * 1e6,
+        )
+
+
+@dev.command()
+@sources_options
+@click.option(
+    "--exporter",
+    "exporters",
+    default=list(settings.EXPORTERS.keys()),
+    multiple=True,
+    type=click.Choice(list(settings.EXPORTERS.keys())),
+    help="Exporter to benchmark (may be repeated, default: all)",
+)
+@click.option(
+    "--compression",
+    "compressions",
+    default=settings.EXPORT_COMPRESSIONS,
+    multiple=True,
+    type=click.Choice(settings.EXPORT_COMPRESSIONS),
+    help="Export compression to benchmark (may be repeated, default: all)",
+)
+def export_benchmark(sources: List[str], exporters: List[str], compressions: List[str]):
+    """Benchmark the write time and size of each exporter with each export compression."""
+    trees = allusgov.build(sources=sources, exporters=[], to_export=False)
+    # Flatten each tree and build its graph first, so only writing the files is timed.
+    sessions = {source: ExportSession(tree) for source, tree in trees.items()}
+    for session in sessions.values():
+        session.flatten()
+        session.build_graph()
+    with tempfile.TemporaryDirectory() as data_dir:
+        for exporter in exporters:
+            uncompressed = None
+            for compression in ["none"] + [
+                compression for compression in compressions if compression != "none"
+            ]:
+                elapsed = 0.0
+                size = 0
+                for source, tree in trees.items():
+                    start = time.perf_counter()
+                    instance = settings.EXPORTERS[exporter](
+                        logger=logger,
+                        source=source,
+                        tree=tree,
+                        data_dir=data_dir,
+                        session=sessions[source],
+                        compression=compression,
+                    )
+                    instance.export()
+                    files = instance.commit()
+                    elapsed += time.perf_counter() - start
+                    for file in files:
+                        path = data_dir + "/" + source + "/" + file
+                        size += os.path.getsize(path)
+                        os.remove(path)
+                # Without compression is always run first, as the reference for size.
+                if compression == "none":
+                    uncompressed = size
+                if compression in compressions:
+                    logger.info(
+                        "%s %s: %.2fs, %.1f MiB, compression ratio %.1f",
+                        exporter,
+                        compression,
+                        elapsed,
+                        size / 1024**2,
+                        cast(int, uncompressed) / max(1, size),
+                    )
+
+
+@dev.command()
+@sources_options
+@click.option(
+    "--merge-base",
+    default=settings.MERGE_BASE,
+    help="Specify the base source for merging",
+)
+@click.option(
+    "--merge-threshold",
+    default=90,
+    type=click.IntRange(min=0, max=100),
+    help="Threshold for fuzzy string matching when merging (0-100)",
+)
+@click.option(
+    "--matcher",
+    "matchers",
+    default=list(settings.MATCHERS.keys()),
+    multiple=True,
+    type=click.Choice(list(settings.MATCHERS.keys())),
+    help="Matcher to benchmark (may be repeated, default: all)",
+)
+def matcher_benchmark(
+    sources: List[str], merge_base: str, merge_threshold: int, matchers: List[str]
+):
+    """Benchmark string matchers against the real source trees."""
+    trees = allusgov.build(sources=sources, exporters=[], to_export=False)
+    base_names = list(Merger.name_list(trees[merge_base], merge_base).keys())
+    source_names = {
+        source: list(Merger.name_list(trees[source], source).keys())
+        for source in sources
+        if source != merge_base
+    }
+    pairs = sum(len(names) for names in source_names.values()) * len(base_names)
+    # The default matcher is always run first, as the reference for agreement.
+    reference: Dict[str, Any] = {}
+    for matcher in ["ratio"] + [matcher for matcher in matchers if matcher != "ratio"]:
+        top = {}
+        tracemalloc.start()
+        start = time.perf_counter()
+        for source, names in source_names.items():
+            similarity = Merger.source_similarity(
+                names,
+                base_names,
+                merge_threshold,
+                matcher=settings.MATCHERS[matcher],
+            )
+            similarity.calculate()
+            # Compare the best candidate of each source name, or -1 for none.
+            top[source] = similarity.columns[:, 0].copy()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if matcher == "ratio":
+            reference = top
+        agreement = sum(
+            int((top[source] == reference[source]).sum()) for source in source_names
+        ) / max(1, sum(len(names) for names in source_names.values()))
+        if matcher in matchers:
+            logger.info(
+                "%s: %.2fs, %.0f pairs/s, peak memory %.1f MiB, "
+                + "best candidate agrees with ratio for %.1f%% of names",
+                matcher,
+                elapsed,
+                pairs / elapsed,
+                peak / 1024**2,
+                agreement * 100,
+            )
+
+
 @dev.command()
 def acronyms_selector():
     """Interatively select acronyms from directory and store results."""
@@ -1,44 +1,372 @@
 import csv
-import datetime
-import fileinput
+import gzip
+import hashlib
+import inspect
 import json
 import os
 import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
 from io import TextIOWrapper
 from logging import Logger
-from typing import Any, Dict, List, Optional, Set, Tuple, cast
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple, cast
 
 import networkx as nx
+import polars as pl
 from bigtree import (
     Node,
     levelorder_iter,
+    preorder_iter,
     tree_to_dataframe,
-    tree_to_dict,
     tree_to_dot,
-    tree_to_nested_dict,
     yield_tree,
 )
 from flatten_json import flatten
 from natsort import natsorted
 from networkx.classes.digraph import DiGraph
 
+from ..merger.state import tree_fingerprint
 from ..utils.utils import full_name
 
 
+class ExportSession:
+    """
+    Flattened tree and graph shared by all the exporters of a tree.
+
+    Each is built on first use and then reused, so exporting a tree in several formats
+    traverses it once and builds its graph once. Exporters must not modify them, and may
+    run in parallel threads.
+    """
+
+    def __init__(self, tree: Node) -> None:
+        self.tree = tree
+        self.flattened: Dict[Optional[int], Tuple[List[Dict[str, Any]], List[str]]] = {}
+        self.graph: Optional[DiGraph] = None
+        self.fingerprint: Optional[str] = None
+        self.lock = threading.RLock()
+
+    def flatten(
+        self, max_depth: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Flatten the tree into a list of dicts, in level order.
+
+        Args:
+            max_depth (int): Optional maximum depth of the organizations to include, from 1 for the root.
+
+        Returns:
+            list: Flattened attributes of each organization, with the node itself as "node".
+            list: Names of all the attributes, starting with path and name.
+        """
+        with self.lock:
+            return self.flatten_locked(max_depth)
+
+    def flatten_locked(
+        self, max_depth: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        if max_depth in self.flattened:
+            return self.flattened[max_depth]
+        if None not in self.flattened:
+            self.flattened[None] = self.flatten_tree()
+        orgs, attrib_names = self.flattened[None]
+        if max_depth is not None:
+            # Level order puts every organization up to a depth before any deeper organization.
+            orgs = [org for org in orgs if cast(Node, org["node"]).depth <= max_depth]
+            names: Set[str] = set()
+            for org in orgs:
+                names.update(org.keys())
+            names.difference_update(["node", "path", "name"])
+            attrib_names = ["path", "name"] + natsorted(names)
+            self.flattened[max_depth] = (orgs, attrib_names)
+        return orgs, attrib_names
+
+    def flatten_tree(self) -> Tuple[List[Dict[str, Any]], List[str]]:
+        orgs: List[Dict[str, Any]] = []
+        attrib_names: Set[str] = set()
+        for org in levelorder_iter(self.tree):
+            org = cast(Node, org)
+            attrs = {}
+            # Create a dict of attributes
+            for key, value in org.describe(
+                exclude_prefix="_", exclude_attributes=["name"]
+            ):
+                attrs[key] = value
+            # Include node in the dict of attributes for reference
+            flat_attrs = {
+                "node": org,
+                "path": org.path_name,
+                "name": org.name,
+            }
+            # Flatten the dict of attributes
+            for key, value in flatten(attrs).items():
+                if isinstance(value, list):
+                    value = json.dumps(value)
+                if value is not None:
+                    flat_attrs[key] = value
+                    attrib_names.add(key)
+            orgs.append(flat_attrs)
+        return (orgs, ["path", "name"] + natsorted(attrib_names))
+
+    def tree_fingerprint(self) -> str:
+        """Return a hash of the structure, names and attributes of the tree."""
+        with self.lock:
+            if self.fingerprint is None:
+                self.fingerprint = tree_fingerprint(self.tree)
+            return self.fingerprint
+
+    def build_graph(self) -> DiGraph:
+        """Return a directed graph of the tree, with edges from each organization to its parent."""
+        with self.lock:
+            if self.graph is None:
+                self.graph = self.build_graph_locked()
+            return self.graph
+
+    def build_graph_locked(self) -> DiGraph:
+        G = nx.DiGraph()
+        for org in self.flatten()[0]:
+            node = cast(Node, org["node"])
+            attrs = {key: value for key, value in org.items() if key != "node"}
+            if node.is_root:
+                G.add_node(node.path_name, **attrs)
+            else:
+                G.add_node(node.path_name, **attrs)
+                parent = cast(Node, node.parent)
+                G.add_edge(node.path_name, parent.path_name)
+        return G
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExportManifest:
+    """
+    Record of the files written by each exporter of a source, kept in the source directory.
+
+    Each exporter is recorded with the key it last ran with, which is a hash of the tree and of
+    the exporter code, and the hash of each file it wrote. An exporter whose key is unchanged
+    and whose files are all still present can be skipped. Deleting the manifest forces every
+    exporter to run again.
+
+    Attributes:
+        path (str): Path of the manifest file.
+        exporters (dict): Key and file hashes of each exporter, by exporter name.
+    """
+
+    def __init__(self, data_dir: str, source: str) -> None:
+        self.path = data_dir + "/" + source + "/" + source + ".manifest.json"
+        self.lock = threading.Lock()
+        self.exporters: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.exporters = json.load(f)["exporters"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    @staticmethod
+    def key(
+        tree_hash: str, exporter: str, exporter_class: type, compression: str = "none"
+    ) -> str:
+        """
+        Return the key of an export, which changes with the tree, the exporter code or the compression.
+
+        Args:
+            tree_hash (str): Fingerprint of the tree.
+            exporter (str): Name of the exporter.
+            exporter_class (type): Exporter class, whose module source is hashed.
+            compression (str): Compression of the output files.
+
+        Returns:
+            str: Hex digest of the export.
+        """
+        digest = hashlib.sha256()
+        for part in [tree_hash, exporter, compression]:
+            digest.update(part.encode("utf-8") + b"\0")
+        digest.update(file_digest(inspect.getfile(exporter_class)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def is_current(self, exporter: str, key: str) -> bool:
+        """Return whether an exporter last ran with the same key and its files are all present."""
+        with self.lock:
+            entry = self.exporters.get(exporter)
+        if entry is None or entry["key"] != key:
+            return False
+        directory = os.path.dirname(self.path)
+        return all(os.path.exists(directory + "/" + file) for file in entry["files"])
+
+    def file_hash(self, file: str) -> Optional[str]:
+        """Return the recorded hash of a file in the source directory, if any."""
+        with self.lock:
+            for entry in self.exporters.values():
+                if file in entry["files"]:
+                    return entry["files"][file]
+        return None
+
+    def record(self, exporter: str, key: str, files: Dict[str, str]) -> List[str]:
+        """
+        Record the key an exporter ran with and the hash of each file it wrote.
+
+        Args:
+            exporter (str): Name of the exporter.
+            key (str): Key the exporter ran with.
+            files (dict): Hash of each file written, by file name.
+
+        Returns:
+            list: Files the exporter wrote last time but not this time, such as files with
+                another compression, which can be removed.
+        """
+        with self.lock:
+            previous = self.exporters.get(exporter, {"files": {}})["files"]
+            self.exporters[exporter] = {"key": key, "files": files}
+        return [file for file in previous if file not in files]
+
+    def save(self) -> None:
+        with self.lock:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"exporters": self.exporters}, f, indent=2, sort_keys=True)
+            os.replace(self.path + ".tmp", self.path)
+
+
 class BaseExporter:
-    def __init__(self, logger: Logger, source: str, tree: Node, data_dir: str) -> None:
+    """
+    Base class for exporters.
+
+    Exporters write each file through open_export, or to the path from export_path, so that it
+    is compressed with the chosen compression and committed atomically.
+
+    Attributes:
+        compression (str): Compression of the output files: "none", "gzip" or "zstd".
+        native_compression (bool): Whether the format compresses its own contents, in which
+            case the exporter passes the compression to its writer, and the file name is not
+            given a compression extension.
+    """
+
+    compression_extensions = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+    native_compression = False
+
+    def __init__(
+        self,
+        logger: Logger,
+        source: str,
+        tree: Node,
+        data_dir: str,
+        session: Optional[ExportSession] = None,
+        compression: str = "none",
+    ) -> None:
         self.logger = logger
         self.source = source
         self.tree = tree
         self.data_dir = data_dir
+        self.session = session if session is not None else ExportSession(tree)
+        self.compression = compression
+        # Temporary path written by the exporter for each output path.
+        self.outputs: Dict[str, str] = {}
         os.makedirs(data_dir + "/" + source, exist_ok=True)
 
     def export_path(self, ext: str, suffix: str = "") -> str:
+        """
+        Return the path to write an export file to.
+
+        This is a temporary file, which commit renames over the output file. The output file
+        name has the extension of the compression, unless the format is compressed natively.
+
+        Args:
+            ext (str): File extension.
+            suffix (str): Optional suffix for the file name, after the source name.
+
+        Returns:
+            str: Path of the temporary file.
+        """
         if suffix != "":
             suffix = "-" + suffix
-        return (
+        path = (
             self.data_dir + "/" + self.source + "/" + self.source + suffix + "." + ext
         )
+        if not self.native_compression:
+            path += self.compression_extensions[self.compression]
+        self.outputs[path] = path + ".tmp"
+        return self.outputs[path]
+
+    @contextmanager
+    def open_export(
+        self, ext: str, suffix: str = "", binary: bool = False
+    ) -> Iterator[IO[Any]]:
+        """
+        Open an export file for writing, compressing it as it is written.
+
+        Gzip output has no file name or time in its header, so the same contents always
+        compress to the same file.
+
+        Args:
+            ext (str): File extension.
+            suffix (str): Optional suffix for the file name, after the source name.
+            binary (bool): Whether to open the file in binary rather than UTF-8 text mode.
+
+        Yields:
+            file: File object to write to.
+        """
+        with open(self.export_path(ext, suffix), "wb") as raw:
+            f: IO[bytes] = raw
+            if self.compression == "gzip":
+                f = cast(
+                    IO[bytes],
+                    gzip.GzipFile(
+                        filename="", mode="wb", fileobj=raw, compresslevel=6, mtime=0
+                    ),
+                )
+            elif self.compression == "zstd":
+                # Imported here, so that zstandard is only needed to write zstd output.
+                import zstandard  # pylint: disable=import-outside-toplevel
+
+                f = cast(IO[bytes], zstandard.ZstdCompressor().stream_writer(raw))
+            stream: IO[Any] = f if binary else TextIOWrapper(f, encoding="utf8")
+            try:
+                yield stream
+            finally:
+                stream.close()
+
+    def commit(self, manifest: Optional[ExportManifest] = None) -> Dict[str, str]:
+        """
+        Rename the temporary files written by export over the output files.
+
+        An output file whose hash in the manifest matches its new contents is left untouched,
+        and the temporary file is removed instead.
+
+        Args:
+            manifest (ExportManifest): Optional manifest of the source directory.
+
+        Returns:
+            dict: Hash of each output file, by file name.
+        """
+        files = {}
+        for path, tmp_path in self.outputs.items():
+            file = os.path.basename(path)
+            files[file] = file_digest(tmp_path)
+            if (
+                manifest is not None
+                and os.path.exists(path)
+                and manifest.file_hash(file) == files[file]
+            ):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        self.outputs = {}
+        return files
+
+    def discard(self) -> None:
+        """Remove the temporary files written by export, after it failed."""
+        for tmp_path in self.outputs.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.outputs = {}
 
     def export(self):
         raise NotImplementedError()
@@ -46,7 +374,7 @@ class BaseExporter:
 
 class TextExporter(BaseExporter):
     def print_tree(
-        self, tree: Node, source: str = "samgov", file: Optional[TextIOWrapper] = None
+        self, tree: Node, source: str = "samgov", file: Optional[IO[str]] = None
     ) -> None:
         for branch, stem, org in yield_tree(tree):
             attrs = {}
@@ -62,32 +390,99 @@ class TextExporter(BaseExporter):
 
     def export(self) -> None:
         self.logger.info("Saving the " + self.source + " tree in text format...")
-        with open(self.export_path("txt"), "w", encoding="utf8") as f:
+        with self.open_export("txt") as f:
             self.print_tree(self.tree, self.source, f)
 
 
 class JSONExporter(BaseExporter):
+    """
+    Export the tree as flat and nested JSON.
+
+    The output is the same as json.dump of tree_to_dict and tree_to_nested_dict with all
+    attributes, indent=2 and sort_keys=True, but it is written one organization at a time
+    rather than building a dict of the whole tree first.
+    """
+
+    encoder = json.JSONEncoder(indent=2, sort_keys=True)
+
     def export(self) -> None:
         self.logger.info("Saving the " + self.source + " tree in JSON flat format...")
-        with open(self.export_path("json", "flat"), "w", encoding="utf8") as f:
-            json.dump(
-                tree_to_dict(self.tree, all_attrs=True), f, indent=2, sort_keys=True
-            )
+        with self.open_export("json", "flat") as f:
+            f.write("{")
+            for i, (path, org) in enumerate(self.flat_orgs()):
+                f.write(("," if i > 0 else "") + "\n  " + json.dumps(path) + ": ")
+                f.write(self.dumps(self.org_dict(org), "  "))
+            f.write("\n}")
 
         self.logger.info("Saving the " + self.source + " tree in JSON tree format...")
-        with open(self.export_path("json", "tree"), "w", encoding="utf8") as f:
-            json.dump(
-                tree_to_nested_dict(self.tree, all_attrs=True),
-                f,
-                indent=2,
-                sort_keys=True,
-            )
+        with self.open_export("json", "tree") as f:
+            self.write_nested(f, self.tree, "")
+
+    def dumps(self, value: Any, indent: str) -> str:
+        """Serialize a value as json.dump would, nested at the given indent."""
+        return self.encoder.encode(value).replace("\n", "\n" + indent)
+
+    @staticmethod
+    def org_dict(org: Node) -> Dict[str, Any]:
+        """Return the name and attributes of an organization, as tree_to_dict would."""
+        attrs = {"name": org.node_name}
+        attrs.update(
+            dict(org.describe(exclude_attributes=["name"], exclude_prefix="_"))
+        )
+        return attrs
+
+    def flat_orgs(self) -> List[Tuple[str, Node]]:
+        """Return the path and node of each organization, sorted by path."""
+        # A later organization with the same path replaces an earlier one, as in tree_to_dict.
+        orgs: Dict[str, Node] = {}
+        for org in preorder_iter(self.tree):
+            org = cast(Node, org)
+            orgs[org.path_name] = org
+        return sorted(orgs.items(), key=lambda item: item[0])
+
+    def write_nested(self, f: IO[str], org: Node, indent: str) -> None:
+        """Write an organization and its descendants, as json.dump of tree_to_nested_dict would."""
+        attrs = self.org_dict(org)
+        keys = list(attrs.keys())
+        if len(org.children) > 0:
+            keys.append("children")
+        inner = indent + "  "
+        f.write("{")
+        for i, key in enumerate(sorted(keys)):
+            f.write(("," if i > 0 else "") + "\n" + inner + json.dumps(key) + ": ")
+            if key == "children":
+                f.write("[")
+                for j, child in enumerate(org.children):
+                    f.write(("," if j > 0 else "") + "\n" + inner + "  ")
+                    self.write_nested(f, cast(Node, child), inner + "  ")
+                f.write("\n" + inner + "]")
+            else:
+                f.write(self.dumps(attrs[key], inner))
+        f.write("\n" + indent + "}")
+
+
+class NDJSONExporter(JSONExporter):
+    """
+    Export the tree as newline-delimited JSON, with one organization per line.
+
+    Each line holds the path, name and attributes of an organization, with sorted keys, and
+    lines are sorted by path, as in the flat JSON format.
+    """
+
+    def export(self) -> None:
+        self.logger.info("Saving the " + self.source + " tree in NDJSON format...")
+        with self.open_export("ndjson") as f:
+            for path, org in self.flat_orgs():
+                attrs = self.org_dict(org)
+                attrs["path"] = path
+                f.write(json.dumps(attrs, sort_keys=True) + "\n")
 
 
 class DotExporter(BaseExporter):
     def export(self) -> None:
         self.logger.info("Saving the " + self.source + " graph in DOT format...")
-        tree_to_dot(self.tree).write(self.export_path("dot"), encoding="utf8")
+        with self.open_export("dot") as f:
+            f.write(tree_to_dot(self.tree).to_string())
 
 
 class CSVExporter(BaseExporter):
@@ -96,50 +491,36 @@ class CSVExporter(BaseExporter):
     def export(self) -> None:
         self.logger.info("Saving the " + self.source + " graph in CSV format...")
         df = tree_to_dataframe(self.tree, all_attrs=True)
-        df.to_csv(self.export_path("csv"), index=False)
+        with self.open_export("csv") as f:
+            df.to_csv(f, index=False)
 
 
 class FlatBaseExporter(BaseExporter):
     """
     Base class for exporters that flatten the tree into a list of dicts.
 
-    The flattened tree is stored in self.orgs, and the set of attribute names
-    is stored in self.attrib_names.
+    The flattened tree is stored in self.orgs_flat, and the list of attribute names
+    is stored in self.attrib_names. Both are shared with the other exporters of
+    the tree through the export session, so they must not be modified.
 
     The original node is included in the dict as "node" for reference, and is
-    typically removed before exporting.
+    skipped when exporting.
     """
 
-    def __init__(self, logger: Logger, source: str, tree: Node, data_dir: str) -> None:
-        super().__init__(logger, source, tree, data_dir)
+    def __init__(
+        self,
+        logger: Logger,
+        source: str,
+        tree: Node,
+        data_dir: str,
+        session: Optional[ExportSession] = None,
+        compression: str = "none",
+    ) -> None:
+        super().__init__(logger, source, tree, data_dir, session, compression)
         self.orgs_flat, self.attrib_names = self.flatten()
 
     def flatten(self, max_depth=None) -> Tuple[List[Dict[str, Any]], List[str]]:
-        orgs: List[Dict[str, Any]] = []
-        attrib_names: Set[str] = set()
-        for org in levelorder_iter(self.tree, max_depth=max_depth):
-            org = cast(Node, org)
-            attrs = {}
-            # Create a dict of attributes
-            for key, value in org.describe(
-                exclude_prefix="_", exclude_attributes=["name"]
-            ):
-                attrs[key] = value
-            # Include node in the dict of attributes for reference
-            flat_attrs = {
-                "node": org,
-                "path": org.path_name,
-                "name": org.name,
-            }
-            # Flatten the dict of attributes
-            for key, value in flatten(attrs).items():
-                if isinstance(value, list):
-                    value = json.dumps(value)
-                if value is not None:
-                    flat_attrs[key] = value
-                    attrib_names.add(key)
-            orgs.append(flat_attrs)
-        return (orgs, ["path", "name"] + natsorted(attrib_names))
+        return self.session.flatten(max_depth)
 
     def export(self):
         pass
@@ -155,7 +536,7 @@ class WideCSVExporter(FlatBaseExporter):
 
     def export(self) -> None:
         self.logger.info("Saving the " + self.source + " tree in wide CSV format...")
-        with open(self.export_path("csv", "wide"), "w", encoding="utf8") as f:
+        with self.open_export("csv", "wide") as f:
             orgs_flat, attrib_names = self.flatten(max_depth=2)
             skip_attribs = []
             # TODO: This approach is a hacky and slow, but it works for now.
@@ -182,7 +563,6 @@ class WideCSVExporter(FlatBaseExporter):
             writer.writeheader()
             for org in orgs_flat:
                 final_attribs = {}
-                del org["node"]
                 for attrib_name, value in org.items():
                     if attrib_name in final_attrib_names:
                         final_attribs[attrib_name] = value
@@ -192,43 +572,216 @@ class WideCSVExporter(FlatBaseExporter):
 class NetworkXBaseExporter(FlatBaseExporter):
     """Base class for exporters that use NetworkX to build a graph."""
 
-    def __init__(self, logger: Logger, source: str, tree: Node, data_dir: str) -> None:
-        super().__init__(logger, source, tree, data_dir)
+    def __init__(
+        self,
+        logger: Logger,
+        source: str,
+        tree: Node,
+        data_dir: str,
+        session: Optional[ExportSession] = None,
+        compression: str = "none",
+    ) -> None:
+        super().__init__(logger, source, tree, data_dir, session, compression)
         self.G = self.build_graph()
 
     def build_graph(self) -> DiGraph:
-        G = nx.DiGraph()
-        for org in self.orgs_flat:
-            node = cast(Node, org["node"])
-            del org["node"]
-            if node.is_root:
-                G.add_node(node.path_name, **org)
-            else:
-                G.add_node(node.path_name, **org)
-                parent = cast(Node, node.parent)
-                G.add_edge(node.path_name, parent.path_name)
-        return G
+        return self.session.build_graph()
 
     def export(self):
         pass
 
 
-class GEXFExporter(NetworkXBaseExporter):
+class XMLGraphExporter(FlatBaseExporter):
+    """
+    Base class for exporters that write the flattened tree as an XML graph in a single pass.
+
+    Each organization is a node identified by its path, with an edge to its parent. The output
+    has the same layout, attribute types and escaping as the NetworkX writers these replace, so
+    files are unchanged for the programs that load them.
+    """
+
+    xml_types = {bool: "boolean", int: "long", float: "double", str: "string"}
+
+    def graph(self) -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, str]]]:
+        """
+        Return the nodes and edges of the graph, as ExportSession.build_graph would.
+
+        Organizations with the same path are a single node, whose attributes are updated by each
+        of them in level order, and each distinct edge is kept once.
+
+        Returns:
+            dict: Attributes of each node, by path, in order of first appearance.
+            list: Source and target path of each edge, from each node to its parents.
+        """
+        nodes: Dict[str, Dict[str, Any]] = {}
+        parents: Dict[str, Dict[str, None]] = {}
+        for org in self.orgs_flat:
+            node = cast(Node, org["node"])
+            path = node.path_name
+            nodes.setdefault(path, {}).update(
+                (key, value) for key, value in org.items() if key != "node"
+            )
+            parents.setdefault(path, {})
+            if node.parent is not None:
+                parents[path][cast(Node, node.parent).path_name] = None
+        edges = [
+            (path, parent) for path, targets in parents.items() for parent in targets
+        ]
+        return nodes, edges
+
+    def xml_type(self, value: Any) -> str:
+        return self.xml_types.get(type(value), "string")
+
+
+class GEXFExporter(XMLGraphExporter):
+    """Export the flattened tree as a GEXF 1.2 graph, without a last modified date."""
+
+    escapes = str.maketrans(
+        {
+            "&": "&amp;",
+            "<": "&lt;",
+            ">": "&gt;",
+            '"': "&quot;",
+            "\t": "&#09;",
+            "\n": "&#10;",
+            "\r": "&#13;",
+        }
+    )
+    header = (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        + '<gexf xmlns="http://www.gexf.net/1.2draft" '
+        + 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        + 'xsi:schemaLocation="http://www.gexf.net/1.2draft http://www.gexf.net/1.2draft/gexf.xsd" '
+        + 'version="1.2">\n'
+        + "  <meta>\n"
+        # Kept from the NetworkX writer, so the output does not change.
+        + f"    <creator>NetworkX {nx.__version__}</creator>\n"
+        + "  </meta>\n"
+        + '  <graph defaultedgetype="directed" mode="static" name="">\n'
+    )
+
+    def value(self, value: Any) -> str:
+        if isinstance(value, bool):
+            return str(value).lower()
+        if isinstance(value, float):
+            return {"inf": "INF", "-inf": "-INF", "nan": "NaN"}.get(
+                str(value), str(value)
+            )
+        return str(value)
+
     def export(self) -> None:
         self.logger.info("Saving the " + self.source + " graph in GEXF format...")
-        nx.write_gexf(self.G, self.export_path("gexf"))
-        # Update the file to remove the  lastmodifieddate attribute, which generates spurious diffs
-        date = datetime.datetime.now().strftime("%Y-%m-%d")
-        with fileinput.input(self.export_path("gexf"), inplace=True) as file:
-            for line in file:
-                line = line.replace(' lastmodifieddate="' + date + '"', "")
-                print(line, end="")
+        nodes, edges = self.graph()
+        # Attributes are declared before the nodes, in order of first use, typed by first value.
+        attribute_ids: Dict[str, str] = {}
+        declarations = []
+        for attrs in nodes.values():
+            for key, value in attrs.items():
+                if key not in attribute_ids:
+                    attribute_ids[key] = str(len(attribute_ids))
+                    declarations.append(
+                        f'      <attribute id="{attribute_ids[key]}" '
+                        + f'title="{key.translate(self.escapes)}" '
+                        + f'type="{self.xml_type(value)}" />\n'
+                    )
+        with self.open_export("gexf") as f:
+            f.write(self.header)
+            if len(declarations) > 0:
+                f.write('    <attributes mode="static" class="node">\n')
+                f.writelines(declarations)
+                f.write("    </attributes>\n")
+            f.write("    <nodes>\n")
+            for path, attrs in nodes.items():
+                node_id = path.translate(self.escapes)
+                f.write(f'      <node id="{node_id}" label="{node_id}">\n')
+                if len(attrs) > 0:
+                    f.write("        <attvalues>\n")
+                    for key, value in attrs.items():
+                        f.write(
+                            f'          <attvalue for="{attribute_ids[key]}" '
+                            + f'value="{self.value(value).translate(self.escapes)}" />\n'
+                        )
+                    f.write("        </attvalues>\n")
+                f.write("      </node>\n")
+            f.write("    </nodes>\n")
+            if len(edges) == 0:
+                f.write("    <edges />\n")
+            else:
+                f.write("    <edges>\n")
+                for edge_id, (source, target) in enumerate(edges):
+                    f.write(
+                        f'      <edge source="{source.translate(self.escapes)}" '
+                        + f'target="{target.translate(self.escapes)}" '
+                        + f'id="{edge_id}" />\n'
+                    )
+                f.write("    </edges>\n")
+            f.write("  </graph>\n</gexf>\n")
 
 
-class GraphMLExporter(NetworkXBaseExporter):
+class GraphMLExporter(XMLGraphExporter):
+    """Export the flattened tree as a GraphML graph."""
+
+    attr_escapes = str.maketrans(
+        {
+            "&": "&amp;",
+            "<": "&lt;",
+            ">": "&gt;",
+            '"': "&quot;",
+            "\t": "&#9;",
+            "\n": "&#10;",
+            "\r": "&#13;",
+        }
+    )
+    text_escapes = str.maketrans(
+        {"&": "&amp;", "<": "&lt;", ">": "&gt;", "\r": "&#13;"}
+    )
+    header = (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        + '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" '
+        + 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+        + 'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns '
+        + 'http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">'
+    )
+
     def export(self) -> None:
         self.logger.info("Saving the " + self.source + " graph in GraphML format...")
-        nx.write_graphml(self.G, self.export_path("graphml"))
+        nodes, edges = self.graph()
+        # Keys are declared before the graph, one for each attribute name and type.
+        key_ids: Dict[Tuple[str, str], str] = {}
+        declarations = []
+        for attrs in nodes.values():
+            for key, value in attrs.items():
+                xml_type = self.xml_type(value)
+                if (key, xml_type) not in key_ids:
+                    key_ids[(key, xml_type)] = f"d{len(key_ids)}"
+                    declarations.append(
+                        f'<key id="{key_ids[(key, xml_type)]}" for="node" '
+                        + f'attr.name="{key.translate(self.attr_escapes)}" '
+                        + f'attr.type="{xml_type}"/>\n'
+                    )
+        with self.open_export("graphml") as f:
+            f.write(self.header)
+            # Keys are listed newest first, as NetworkX does.
+            f.writelines(reversed(declarations))
+            f.write('<graph edgedefault="directed">')
+            for path, attrs in nodes.items():
+                node_id = path.translate(self.attr_escapes)
+                if len(attrs) == 0:
+                    f.write(f'<node id="{node_id}"/>\n')
+                    continue
+                f.write(f'<node id="{node_id}">\n')
+                for key, value in attrs.items():
+                    f.write(
+                        f'  <data key="{key_ids[(key, self.xml_type(value))]}">'
+                        + f"{str(value).translate(self.text_escapes)}</data>\n"
+                    )
+                f.write("</node>\n")
+            for source, target in edges:
+                f.write(
+                    f'<edge source="{source.translate(self.attr_escapes)}" '
+                    + f'target="{target.translate(self.attr_escapes)}"/>\n'
+                )
+            f.write("</graph></graphml>")
 
 
 class CytoscapeJSONExporter(NetworkXBaseExporter):
@@ -236,7 +789,302 @@ class CytoscapeJSONExporter(NetworkXBaseExporter):
         self.logger.info(
             "Saving the " + self.source + " graph in Cytoscape JSON format..."
         )
-        with open(self.export_path("cyjs"), "w", encoding="utf8") as f:
+        with self.open_export("cyjs") as f:
             json.dump(
                 nx.cytoscape_data(self.G)["elements"], f, indent=2, sort_keys=True
             )
+
+
+class ParquetExporter(FlatBaseExporter):
+    """
+    Export the flattened tree as a Parquet table, with one row per organization.
+
+    The table has typed path, name, parent_path and depth columns, then a column for each
+    top-level attribute, which is a struct for each source's attributes. Nested attributes are
+    kept as struct and list columns rather than JSON strings. Types are inferred from every
+    value, and a field with values of conflicting types is stored as JSON strings.
+    """
+
+    native_compression = True
+
+    def table(self) -> pl.DataFrame:
+        """Return the table of organizations, in level order."""
+        nodes = [cast(Node, org["node"]) for org in self.orgs_flat]
+        columns: Dict[str, List[Any]] = {}
+        for i, node in enumerate(nodes):
+            for key, value in node.describe(
+                exclude_prefix="_", exclude_attributes=["name"]
+            ):
+                if key not in columns:
+                    columns[key] = [None] * len(nodes)
+                columns[key][i] = value
+        df = pl.DataFrame(
+            {
+                "path": [org["path"] for org in self.orgs_flat],
+                "name": [org["name"] for org in self.orgs_flat],
+                "parent_path": [
+                    None if node.parent is None else node.parent.path_name
+                    for node in nodes
+                ],
+                "depth": [node.depth for node in nodes],
+            },
+            schema={
+                "path": pl.Utf8,
+                "name": pl.Utf8,
+                "parent_path": pl.Utf8,
+                "depth": pl.Int32,
+            },
+        )
+        for key, values in columns.items():
+            kind: Any = None
+            for value in values:
+                kind = self.widen(kind, value)
+            df = df.with_columns(
+                pl.Series(
+                    key,
+                    [self.coerce(value, kind) for value in values],
+                    dtype=self.dtype(kind),
+                )
+            )
+        return df
+
+    @classmethod
+    def widen(cls, kind: Any, value: Any) -> Any:
+        """
+        Return the kind of value that can hold both the given kind and value.
+
+        Kinds are None for no values, a scalar type name, a dict of field kinds for a struct,
+        or a list of the item kind for a list. Conflicting kinds widen to str.
+        """
+        if value is None or (isinstance(value, dict) and len(value) == 0):
+            return kind
+        if isinstance(value, dict):
+            if kind is None:
+                kind = {}
+            if not isinstance(kind, dict):
+                return "str"
+            for key, item in value.items():
+                kind[str(key)] = cls.widen(kind.get(str(key)), item)
+            return kind
+        if isinstance(value, list):
+            if kind is None:
+                kind = [None]
+            if not isinstance(kind, list):
+                return "str"
+            for item in value:
+                kind[0] = cls.widen(kind[0], item)
+            return kind
+        if isinstance(value, bool):
+            scalar = "bool"
+        elif isinstance(value, int):
+            scalar = "int" if -(2**63) <= value < 2**63 else "str"
+        elif isinstance(value, float):
+            scalar = "float"
+        else:
+            scalar = "str"
+        if kind is None or kind == scalar:
+            return scalar
+        if isinstance(kind, str) and {kind, scalar} == {"int", "float"}:
+            return "float"
+        return "str"
+
+    @classmethod
+    def dtype(cls, kind: Any) -> pl.DataType:
+        """Return the Polars type for a kind returned by widen."""
+        if kind is None:
+            return pl.Null()
+        if isinstance(kind, dict):
+            return pl.Struct([pl.Field(k, cls.dtype(v)) for k, v in kind.items()])
+        if isinstance(kind, list):
+            return pl.List(cls.dtype(kind[0]))
+        return {
+            "bool": pl.Boolean(),
+            "int": pl.Int64(),
+            "float": pl.Float64(),
+            "str": pl.Utf8(),
+        }[kind]
+
+    @classmethod
+    def coerce(cls, value: Any, kind: Any) -> Any:
+        """Convert a value to fit a kind returned by widen, storing conflicting values as JSON."""
+        if value is None:
+            return None
+        if kind == "str":
+            return value if isinstance(value, str) else json.dumps(value)
+        if kind == "float":
+            return float(value)
+        if isinstance(kind, dict):
+            if len(value) == 0:
+                return None
+            # Field names are the string form of the keys, as in widen.
+            fields = {str(key): item for key, item in value.items()}
+            return {
+                key: cls.coerce(fields.get(key), item) for key, item in kind.items()
+            }
+        if isinstance(kind, list):
+            return [cls.coerce(item, kind[0]) for item in value]
+        return value
+
+    def export(self) -> None:
+        self.logger.info("Saving the " + self.source + " tree in Parquet format...")
+        # Parquet pages are zstd compressed by default, and can use gzip instead.
+        self.table().write_parquet(
+            self.export_path("parquet"),
+            compression="gzip" if self.compression == "gzip" else "zstd",
+        )
+
+
+class ArrowExporter(ParquetExporter):
+    """
+    Export the flattened tree as an Arrow IPC file, with the same table as ParquetExporter.
+
+    The file is uncompressed, so that it can be memory mapped when read, unless an export
+    compression is chosen.
+    """
+
+    native_compression = False
+
+    def export(self) -> None:
+        self.logger.info("Saving the " + self.source + " tree in Arrow IPC format...")
+        with self.open_export("arrow", binary=True) as f:
+            self.table().write_ipc(f, compression="uncompressed")
+
+
+class SQLiteExporter(FlatBaseExporter):
+    """
+    Export the tree as a SQLite database, for indexed subtree and ancestry queries.
+
+    The database has these tables:
+    - nodes: id, path, name, parent_id and depth of each organization, in level order, where
+      paths can repeat as names may contain the path separator
+    - attributes: node_id, source and JSON data of each top-level attribute of each organization,
+      which for the merged tree is one row per source the organization was found in
+    - closure: every ancestor_id and descendant_id pair, with the distance between them,
+      including each organization as its own ancestor at distance 0
+
+    For example, the organizations under a department that came from usaspending are:
+
+        SELECT n.* FROM nodes d
+        JOIN closure c ON c.ancestor_id = d.id
+        JOIN nodes n ON n.id = c.descendant_id
+        JOIN attributes a ON a.node_id = n.id AND a.source = 'usaspending'
+        WHERE d.path = ?
+    """
+
+    schema = """
+        CREATE TABLE nodes (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            name TEXT NOT NULL,
+            parent_id INTEGER REFERENCES nodes (id),
+            depth INTEGER NOT NULL
+        );
+        CREATE TABLE attributes (
+            node_id INTEGER NOT NULL REFERENCES nodes (id),
+            source TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (node_id, source)
+        ) WITHOUT ROWID;
+        CREATE TABLE closure (
+            ancestor_id INTEGER NOT NULL REFERENCES nodes (id),
+            descendant_id INTEGER NOT NULL REFERENCES nodes (id),
+            distance INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        ) WITHOUT ROWID;
+    """
+
+    indexes = """
+        CREATE INDEX nodes_path ON nodes (path);
+        CREATE INDEX nodes_name ON nodes (name);
+        CREATE INDEX nodes_parent_id ON nodes (parent_id);
+        CREATE INDEX attributes_source ON attributes (source, node_id);
+        CREATE INDEX closure_descendant_id ON closure (descendant_id, distance);
+    """
+
+    def export(self) -> None:
+        self.logger.info("Saving the " + self.source + " tree in SQLite format...")
+        if self.compression == "none":
+            self.write_database(self.export_path("sqlite"))
+            return
+        # SQLite cannot write to a stream, so build the database and then compress it.
+        fd, path = tempfile.mkstemp(
+            suffix=".sqlite", dir=self.data_dir + "/" + self.source
+        )
+        os.close(fd)
+        try:
+            self.write_database(path)
+            with open(path, "rb") as db, self.open_export("sqlite", binary=True) as f:
+                shutil.copyfileobj(db, f, 1 << 20)
+        finally:
+            os.remove(path)
+
+    def write_database(self, path: str) -> None:
+        """Write the database to a file, replacing any existing file."""
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        try:
+            conn.executescript(self.schema)
+            # Load everything in one transaction, and index once the tables are full.
+            with conn:
+                conn.executemany(
+                    "INSERT INTO nodes VALUES (?, ?, ?, ?, ?)", self.node_rows()
+                )
+                conn.executemany(
+                    "INSERT INTO attributes VALUES (?, ?, ?)", self.attribute_rows()
+                )
+                conn.executemany(
+                    "INSERT INTO closure VALUES (?, ?, ?)", self.closure_rows()
+                )
+            conn.executescript(self.indexes + "ANALYZE;")
+        finally:
+            conn.close()
+
+    def nodes(self) -> List[Node]:
+        """Return the organizations in level order, so the id of each is its index plus one."""
+        return [cast(Node, org["node"]) for org in self.orgs_flat]
+
+    def node_ids(self) -> Dict[int, int]:
+        """Return the id of each organization, keyed by id() of the node."""
+        return {id(node): i + 1 for i, node in enumerate(self.nodes())}
+
+    def node_rows(self) -> List[Tuple[int, str, str, Optional[int], int]]:
+        ids = self.node_ids()
+        return [
+            (
+                i + 1,
+                org["path"],
+                org["name"],
+                None if node.parent is None else ids[id(node.parent)],
+                node.depth,
+            )
+            for i, (org, node) in enumerate(zip(self.orgs_flat, self.nodes()))
+        ]
+
+    def attribute_rows(self) -> List[Tuple[int, str, str]]:
+        return [
+            (i + 1, key, json.dumps(value, sort_keys=True))
+            for i, node in enumerate(self.nodes())
+            for key, value in node.describe(
+                exclude_prefix="_", exclude_attributes=["name"]
+            )
+            if value is not None
+        ]
+
+    def closure_rows(self) -> List[Tuple[int, int, int]]:
+        ids = self.node_ids()
+        # Level order reaches each parent before its children, so its ancestors are known.
+        ancestors: Dict[int, List[int]] = {}
+        rows: List[Tuple[int, int, int]] = []
+        for node in self.nodes():
+            node_id = ids[id(node)]
+            parent_ancestors = (
+                [] if node.parent is None else ancestors[ids[id(node.parent)]]
+            )
+            ancestors[node_id] = parent_ancestors + [node_id]
+            depth = len(ancestors[node_id])
+            rows.extend(
+                (ancestor_id, node_id, depth - 1 - i)
+                for i, ancestor_id in enumerate(ancestors[node_id])
+            )
+        return rows
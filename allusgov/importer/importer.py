@@ -1,8 +1,8 @@
 import json
 from logging import Logger
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
-from bigtree import Node, nested_dict_to_tree
+from bigtree import Node
 
 
 class Importer:
@@ -31,35 +31,66 @@ class Importer:
         ) as file:
             return json.load(file)
 
+    def build_index(self, ids: Dict) -> Dict[Any, List]:
+        """
+        Build an adjacency index from the given parent mapping.
+
+        Args:
+            ids (Dict): A dictionary that maps ids to their parent ids.
+
+        Returns:
+            Dict: A dictionary that maps parent ids to a list of their child ids, in source order.
+        """
+        index: Dict[Any, List] = {}
+        for item_id, parent in ids.items():
+            if parent not in index:
+                index[parent] = []
+            index[parent].append(item_id)
+        return index
+
     def build_tree(
         self, ids: Dict, attributes: Dict, target_id: str, source_name: str
-    ) -> List:
+    ) -> Node:
         """
-        Recursively build a tree from the given data.
+        Build a tree from the given data.
+
+        The parent to children index is built once and walked iteratively to create the nodes.
+        The children of each node are then attached in a single assignment, deepest parents
+        first, so that no node has ancestors yet when its children are checked. This runs in
+        linear time and is not limited by the recursion depth of the tree.
 
         Args:
             ids (Dict): A dictionary that maps ids to their parent ids.
             attributes (Dict): A dictionary that maps ids to their attributes.
-            target_id (str): The id of the target node.
+            target_id (str): The id of the target node, which becomes the root.
             source_name (str): The name of the data source.
 
         Returns:
-            List: A list of child dictionaries representing the tree structure.
+            Node: The root node of the tree.
         """
-        children = []
-        for item_id, parent in ids.items():
-            if parent == target_id:
-                child = {source_name: attributes[item_id]}
+        index = self.build_index(ids)
+        root_attrs: Dict[str, Any] = {source_name: {"name": target_id}}
+        root = Node(target_id, **root_attrs)
+        families: List[Tuple[Node, List[Node]]] = []
+        stack = [(target_id, root)]
+        while stack:
+            parent_id, parent = stack.pop()
+            children: List[Node] = []
+            for item_id in index.get(parent_id, []):
                 # Prefix the name (which is the node name here) with the source name
-                child["name"] = "[" + source_name + "] " + child[source_name]["name"]
+                name = "[" + source_name + "] " + attributes[item_id]["name"]
                 # If the ID is not the same as the name, append the ID to the name
-                if child[source_name]["name"] != item_id:
-                    child["name"] = child["name"] + " (" + str(item_id) + ")"
-                child["children"] = self.build_tree(
-                    ids, attributes, item_id, source_name
-                )
+                if attributes[item_id]["name"] != item_id:
+                    name = name + " (" + str(item_id) + ")"
+                child = Node(name, **{source_name: attributes[item_id]})
                 children.append(child)
-        return children
+                stack.append((item_id, child))
+            if len(children) > 0:
+                families.append((parent, children))
+        # Every parent is created before its children, so attaching in reverse goes bottom up.
+        for parent, children in reversed(families):
+            parent.children = children
+        return root
 
     def build(self) -> Node:
         """
@@ -103,11 +134,4 @@ class Importer:
                 if attribute not in ["parent", "parent_id"]:
                     attributes[item[key]][attribute] = value
 
-        tree_dict = {
-            "name": self.root,
-            self.source_name: {
-                "name": self.root,
-            },
-            "children": self.build_tree(ids, attributes, self.root, self.source_name),
-        }
-        return nested_dict_to_tree(tree_dict)
+        return self.build_tree(ids, attributes, self.root, self.source_name)
@@ -0,0 +1,38 @@
+import random
+from logging import Logger
+from typing import Dict, List
+
+from .importer import Importer
+
+
+class SyntheticImporter(Importer):
+    """An importer that generates a random hierarchy, or a single deep chain, for benchmarking."""
+
+    def __init__(
+        self,
+        logger: Logger,
+        size: int,
+        seed: int = 0,
+        chain: bool = False,
+        source_name: str = "synthetic",
+        data_dir: str = "",
+    ) -> None:
+        self.size = size
+        self.seed = seed
+        self.chain = chain
+        super().__init__(logger, source_name=source_name, data_dir=data_dir)
+
+    def load_data(self) -> List[Dict]:
+        rng = random.Random(self.seed)
+        data = []
+        for i in range(self.size):
+            if self.chain:
+                # Attach each node to the one before, giving a tree as deep as it is large.
+                parent_id = f"org-{i - 1}" if i > 0 else None
+            else:
+                # Attach each node to a random earlier node, giving a bushy tree of logarithmic depth.
+                parent_id = f"org-{rng.randrange(i)}" if i > 10 else None
+            data.append(
+                {"id": f"org-{i}", "parent_id": parent_id, "name": f"Office {i}"}
+            )
+        return data
@@ -0,0 +1,68 @@
+from typing import Dict, List, Set
+
+import numpy as np
+
+BLOCKING_MODES = ["token", "ngram"]
+
+
+class BlockingIndex:
+    """
+    Inverted index from blocking keys to the names that contain them.
+
+    Only pairs of names that share at least one blocking key are worth scoring. Keys are either
+    the whitespace-separated tokens of a name, or its character trigrams. Keys found in more than
+    max_frequency of the names (such as "of" or "department") are dropped, as they prune nothing.
+
+    Attributes:
+        mode (str): Blocking key type, either "token" or "ngram".
+        postings (Dict[str, np.ndarray]): Indexes of the names that contain each key.
+    """
+
+    def __init__(self, names: List[str], mode: str, max_frequency: float = 0.1) -> None:
+        if mode not in BLOCKING_MODES:
+            raise ValueError(f"Unknown blocking mode: {mode}")
+        self.mode = mode
+        postings: Dict[str, List[int]] = {}
+        for column, name in enumerate(names):
+            for key in self.keys(name):
+                if key not in postings:
+                    postings[key] = []
+                postings[key].append(column)
+        max_postings = max(1, int(len(names) * max_frequency))
+        self.postings = {
+            key: np.array(columns, dtype=np.int32)
+            for key, columns in postings.items()
+            if len(columns) <= max_postings
+        }
+
+    def keys(self, name: str) -> Set[str]:
+        """
+        Return the blocking keys for a name.
+
+        Args:
+            name (str): Processed name.
+
+        Returns:
+            set: Set of blocking keys.
+        """
+        if self.mode == "token":
+            return set(name.split())
+        padded = " " + name + " "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    def lookup(self, name: str) -> np.ndarray:
+        """
+        Return the indexes of the names that share a blocking key with the given name.
+
+        Args:
+            name (str): Processed name.
+
+        Returns:
+            np.ndarray: Sorted array of name indexes.
+        """
+        postings = [
+            self.postings[key] for key in self.keys(name) if key in self.postings
+        ]
+        if len(postings) == 0:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(postings))
@@ -0,0 +1,208 @@
+from typing import Dict, List, Optional, Set, Tuple, cast
+
+import polars as pl
+from bigtree import levelorder_iter
+from bigtree.node.node import Node
+
+from ..utils.utils import full_name
+from .merger import Merger
+
+
+class HierarchicalMerger(Merger):
+    """
+    Merge class that matches the source tree top down, within the subtrees of matched parents.
+
+    Top-level organizations are matched against the whole base tree. The candidates for every
+    other organization are then restricted to the descendants of the base organization its
+    nearest matched ancestor was merged into, which avoids matching offices with common names
+    into the wrong department. Organizations with no matched ancestor, or with no candidate
+    scoring above the threshold within that subtree, fall back to the whole base tree.
+
+    All decisions are made against the unchanged trees and then applied bottom up, as in Merger.
+    """
+
+    def plan(self) -> List[Tuple[Node, Node, float]]:
+        """
+        Decide where each source organization would be merged, top down, without changing either tree.
+
+        Returns:
+            list: Source organization, selected base organization and score of each decision,
+                in the order merge applies them.
+        """
+        self.logger.info(
+            f"Checking for {self.source_name} matches against the base tree, top down..."
+        )
+        decisions: Dict[Node, Tuple[Node, float]] = {}
+        # The base organization each source organization is restricted to, or None for the whole tree.
+        scopes: Dict[Node, Optional[Node]] = {}
+        pairs = 0
+        source_orgs: List[Node] = []
+        level = [self.source_tree]
+        while len(level) > 0:
+            groups: Dict[Optional[Node], List[Node]] = {}
+            for source_org in level:
+                scope = None
+                parent = cast(Optional[Node], source_org.parent)
+                if parent is not None:
+                    scope = scopes[parent]
+                    if parent in decisions and decisions[parent][1] > self.threshold:
+                        scope = decisions[parent][0]
+                if scope is not None and scope.is_root:
+                    scope = None
+                scopes[source_org] = scope
+                if scope not in groups:
+                    groups[scope] = []
+                groups[scope].append(source_org)
+            for scope, scope_orgs in groups.items():
+                pairs += self.select_in_scope(scope, scope_orgs, decisions)
+            source_orgs.extend(level)
+            level = [
+                cast(Node, child)
+                for source_org in level
+                for child in source_org.children
+            ]
+        full_pairs = len(self.source_names) * len(self.base_names)
+        self.logger.info(
+            f"Scored {pairs} name pairs for {self.source_name}, "
+            + f"{pairs / max(1, full_pairs):.1%} of a full comparison"
+        )
+
+        source_orgs.reverse()
+        return [
+            (source_org, *decisions[source_org])
+            for source_org in source_orgs
+            if source_org in decisions
+        ]
+
+    def sweep(self, thresholds: List[int]) -> Tuple[pl.DataFrame, pl.DataFrame]:
+        """
+        Report the merge decisions for each threshold, planning once per threshold.
+
+        Scopes depend on which parents were merged, so unlike Merger.sweep the decisions cannot
+        be read from a single scoring pass. Thresholds are planned in increasing order with the
+        cutoff of each, so that names scored against the whole base tree at a lower threshold
+        are not scored again. The Merger must be created with a threshold no higher than the
+        lowest swept threshold.
+
+        Args:
+            thresholds (list): Thresholds to report on.
+
+        Returns:
+            pl.DataFrame: Selected candidate for each source organization at each threshold.
+            pl.DataFrame: Number of matches and nodes added to the base tree at each threshold.
+        """
+        self.logger.info(
+            f"Sweeping {self.source_name} thresholds against the base tree, top down..."
+        )
+        source_orgs = [
+            cast(Node, source_org) for source_org in levelorder_iter(self.source_tree)
+        ]
+        decisions: Dict[str, List] = {
+            "threshold": [],
+            "source": [],
+            "source_path": [],
+            "base_path": [],
+            "candidate_score": [],
+            "score": [],
+            "merged": [],
+        }
+        merged: Dict[int, Set[Node]] = {threshold: set() for threshold in thresholds}
+        original = (self.threshold, self.similarity.cutoff)
+        for threshold in sorted(merged):
+            self.threshold = threshold
+            self.similarity.cutoff = threshold * 0.8
+            for source_org, selection, score in self.plan():
+                decisions["threshold"].append(threshold)
+                decisions["source"].append(self.source_name)
+                decisions["source_path"].append(source_org.path_name)
+                decisions["base_path"].append(selection.path_name)
+                decisions["candidate_score"].append(
+                    self.similarity.score(
+                        full_name(source_org, self.source_name, self.name_field),
+                        full_name(selection, self.base_name, self.name_field),
+                    )
+                )
+                decisions["score"].append(score)
+                decisions["merged"].append(score > threshold)
+                if score > threshold:
+                    merged[threshold].add(source_org)
+        self.threshold, self.similarity.cutoff = original
+        return pl.DataFrame(decisions), self.sweep_summary(source_orgs, merged)
+
+    def select_in_scope(
+        self,
+        scope: Optional[Node],
+        source_orgs: List[Node],
+        decisions: Dict[Node, Tuple[Node, float]],
+    ) -> int:
+        """
+        Select candidates for source organizations from the descendants of a base organization.
+
+        Source organizations with no candidate scoring above the threshold within the scope are
+        selected again from the whole base tree, keeping the better of the two selections.
+
+        Args:
+            scope (Node): Base organization to search within, or None for the whole base tree.
+            source_orgs (list): Source organization nodes.
+            decisions (dict): Selected base organization and score for each source organization, updated in place.
+
+        Returns:
+            int: Number of name pairs scored.
+        """
+        names = list(
+            dict.fromkeys(
+                full_name(source_org, self.source_name, self.name_field)
+                for source_org in source_orgs
+            )
+        )
+        if scope is None:
+            similarity = self.similarity
+            base_names = self.base_names
+            similarity.calculate([similarity.rows[name] for name in names])
+        else:
+            base_names = {}
+            for base_org in scope.descendants:
+                base_org = cast(Node, base_org)
+                name = full_name(base_org, self.base_name, self.name_field)
+                if name not in base_names:
+                    base_names[name] = []
+                base_names[name].append(base_org)
+            similarity = self.source_similarity(
+                names,
+                list(base_names.keys()),
+                self.threshold,
+                memory_limit=self.memory_limit,
+                matcher=self.matcher,
+                processed_names=self.processed_names,
+            )
+            similarity.calculate()
+        unmatched: List[Node] = []
+        for source_org in source_orgs:
+            source_org_name = full_name(source_org, self.source_name, self.name_field)
+            candidates = self.get_candidates(source_org_name, similarity, base_names)
+            if len(candidates) == 0:
+                self.logger.debug(f"No candidates for {source_org_name}")
+            else:
+                self.logger.debug(f"Checking {len(candidates)} for {source_org_name}")
+                decisions[source_org] = self.process_candidates(candidates, source_org)
+            if scope is not None and (
+                source_org not in decisions
+                or decisions[source_org][1] <= self.threshold
+            ):
+                unmatched.append(source_org)
+        pairs = len(names) * len(base_names)
+        if len(unmatched) > 0:
+            self.logger.debug(
+                f"Checking {len(unmatched)} organizations unmatched within "
+                + f"{cast(Node, scope).path_name} against the whole base tree"
+            )
+            scoped = {
+                source_org: decisions[source_org]
+                for source_org in unmatched
+                if source_org in decisions
+            }
+            pairs += self.select_in_scope(None, unmatched, decisions)
+            for source_org, decision in scoped.items():
+                if decision[1] >= decisions[source_org][1]:
+                    decisions[source_org] = decision
+        return pairs
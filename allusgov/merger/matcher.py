@@ -0,0 +1,327 @@
+import math
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+
+class Matcher:
+    """
+    Base class for string matchers, which score pairs of names from 0 to 100.
+
+    Names are processed once with process, and all scoring methods take processed names.
+
+    Attributes:
+        name (str): Stable name of the matcher, used in cache keys.
+        exact (bool): Whether only identical processed names score 100, so that exact matches can
+            be found without scoring.
+        corpus (bool): Whether scores depend on the names the matcher was fitted to.
+        cell_bytes (int): Upper bound on the memory used per cell while scoring a matrix, used
+            to size chunks for a memory limit.
+    """
+
+    name = ""
+    exact = False
+    corpus = False
+    cell_bytes = 16
+
+    def process(self, name: str) -> str:
+        """Return the processed form of a name."""
+        return utils.default_process(name)
+
+    def fit(self, names: List[str]) -> "Matcher":
+        """
+        Return a matcher fitted to the given processed names.
+
+        Args:
+            names (list): Processed names that will be scored.
+
+        Returns:
+            Matcher: Fitted matcher, which may be this one.
+        """
+        return self
+
+    def cdist(
+        self,
+        queries: List[str],
+        choices: List[str],
+        score_cutoff: float,
+        workers: int = 1,
+    ) -> np.ndarray:
+        """
+        Score every query against every choice.
+
+        Args:
+            queries (list): Processed names, one per row.
+            choices (list): Processed names, one per column.
+            score_cutoff (float): Scores below this are set to 0.
+            workers (int): Number of threads to use, -1 for all cores.
+
+        Returns:
+            np.ndarray: float32 matrix of scores.
+        """
+        raise NotImplementedError()
+
+    def cpdist(
+        self, queries: List[str], choices: List[str], workers: int = 1
+    ) -> np.ndarray:
+        """
+        Score each query against the choice at the same position.
+
+        Args:
+            queries (list): Processed names.
+            choices (list): Processed names, as many as queries.
+            workers (int): Number of threads to use, -1 for all cores.
+
+        Returns:
+            np.ndarray: float32 array of scores.
+        """
+        raise NotImplementedError()
+
+    def score(self, query: str, choice: str) -> float:
+        """Score a single pair of processed names."""
+        return float(self.cpdist([query], [choice])[0])
+
+
+class RapidfuzzMatcher(Matcher):
+    """
+    Matcher for a rapidfuzz scorer.
+
+    Attributes:
+        scorer (Callable): rapidfuzz scorer function.
+    """
+
+    def __init__(self, name: str, scorer: Callable, exact: bool = False) -> None:
+        self.name = name
+        self.scorer = scorer
+        self.exact = exact
+
+    def cdist(
+        self,
+        queries: List[str],
+        choices: List[str],
+        score_cutoff: float,
+        workers: int = 1,
+    ) -> np.ndarray:
+        return process.cdist(
+            queries,
+            choices,
+            scorer=self.scorer,
+            processor=None,
+            score_cutoff=score_cutoff,
+            dtype=np.float32,
+            workers=workers,
+        )
+
+    def cpdist(
+        self, queries: List[str], choices: List[str], workers: int = 1
+    ) -> np.ndarray:
+        return process.cpdist(
+            queries,
+            choices,
+            scorer=self.scorer,
+            processor=None,
+            dtype=np.float32,
+            workers=workers,
+        )
+
+    def score(self, query: str, choice: str) -> float:
+        return float(np.float32(self.scorer(query, choice, processor=None)))
+
+
+class Vectors(NamedTuple):
+    """
+    Sparse vectors for a list of names, as flat arrays of (row, term, weight) entries.
+
+    Entries are sorted by row, then term, and each row has unit length.
+    """
+
+    rows: np.ndarray
+    terms: np.ndarray
+    weights: np.ndarray
+
+
+class TfidfMatcher(Matcher):
+    """
+    Matcher scoring the cosine similarity of character n-gram TF-IDF vectors.
+
+    Names are split into overlapping n-grams, padded with a space at each end. Each n-gram is
+    weighted by its count in the name and its smoothed inverse document frequency among the
+    fitted names, and the vectors are normalized to unit length. N-grams that were not seen when
+    fitting get the highest weight. Vectors are kept as flat arrays of sparse entries, and the
+    choices are inverted into postings by term, so that only pairs of names sharing an n-gram
+    are multiplied. The products are summed in batches of query entries, so that the expanded
+    postings stay within a fraction of the matrix however many pairs share an n-gram.
+
+    Attributes:
+        n (int): Length of the n-grams.
+        vocabulary (Dict[str, int]): Term index of each fitted n-gram.
+        idf (np.ndarray): Inverse document frequency of each fitted term.
+        documents (int): Number of names fitted.
+        postings (tuple): Last list of choices, with its vectors sorted by term and the term
+            indexes of its unseen n-grams.
+    """
+
+    name = "tfidf"
+    corpus = True
+    # The float64 sums and the batch being added, the float32 matrix and the batch entries.
+    cell_bytes = 32
+
+    def __init__(
+        self,
+        n: int = 3,
+        vocabulary: Optional[Dict[str, int]] = None,
+        idf: Optional[np.ndarray] = None,
+        documents: int = 0,
+    ) -> None:
+        self.n = n
+        self.vocabulary = vocabulary if vocabulary is not None else {}
+        self.idf = idf if idf is not None else np.empty(0, dtype=np.float64)
+        self.documents = documents
+        self.postings: Optional[Tuple[List[str], Vectors, Dict[str, int]]] = None
+
+    def ngrams(self, name: str) -> List[str]:
+        padded = " " + name + " "
+        return [padded[i : i + self.n] for i in range(max(1, len(padded) - self.n + 1))]
+
+    def fit(self, names: List[str]) -> "TfidfMatcher":
+        vocabulary: Dict[str, int] = {}
+        frequencies: List[int] = []
+        for name in names:
+            for gram in set(self.ngrams(name)):
+                term = vocabulary.setdefault(gram, len(vocabulary))
+                if term == len(frequencies):
+                    frequencies.append(0)
+                frequencies[term] += 1
+        idf = np.log((1 + len(names)) / (1 + np.array(frequencies, dtype=np.float64)))
+        return TfidfMatcher(self.n, vocabulary, idf + 1, len(names))
+
+    def vectorize(self, names: List[str], unseen: Dict[str, int]) -> Vectors:
+        """
+        Return the unit-length TF-IDF vectors of the given names.
+
+        Args:
+            names (list): Processed names.
+            unseen (dict): Term index of each n-gram not in the vocabulary, numbered after it.
+                New n-grams are added to it, so that names vectorized with the same dict match
+                on their unseen n-grams.
+
+        Returns:
+            Vectors: The sparse vectors, one row per name.
+        """
+        rows: List[int] = []
+        terms: List[int] = []
+        for row, name in enumerate(names):
+            for gram in self.ngrams(name):
+                term = self.vocabulary.get(gram)
+                if term is None:
+                    term = unseen.setdefault(gram, len(self.vocabulary) + len(unseen))
+                rows.append(row)
+                terms.append(term)
+        width = max(1, len(self.vocabulary) + len(unseen))
+        idf = np.full(width, math.log(1 + self.documents) + 1)
+        idf[: len(self.idf)] = self.idf
+        # Count each (row, term) pair, giving sorted unique entries.
+        keys, counts = np.unique(
+            np.array(rows, dtype=np.int64) * width + np.array(terms, dtype=np.int64),
+            return_counts=True,
+        )
+        entry_rows = keys // width
+        entry_terms = keys % width
+        weights = counts * idf[entry_terms]
+        norms = np.sqrt(
+            np.bincount(entry_rows, weights=weights**2, minlength=len(names))
+        )
+        weights = weights / norms[entry_rows]
+        return Vectors(entry_rows, entry_terms, weights)
+
+    def inverted(self, choices: List[str]) -> Tuple[Vectors, Dict[str, int]]:
+        """
+        Return the vectors of the choices sorted by term, reusing them for the same list.
+
+        Returns:
+            Vectors: The sparse vectors of the choices, sorted by term.
+            dict: Term index of each unseen n-gram of the choices.
+        """
+        if self.postings is None or self.postings[0] is not choices:
+            unseen: Dict[str, int] = {}
+            vectors = self.vectorize(choices, unseen)
+            order = np.argsort(vectors.terms, kind="stable")
+            self.postings = (
+                choices,
+                Vectors(
+                    vectors.rows[order], vectors.terms[order], vectors.weights[order]
+                ),
+                unseen,
+            )
+        return self.postings[1], self.postings[2]
+
+    def cdist(
+        self,
+        queries: List[str],
+        choices: List[str],
+        score_cutoff: float,
+        workers: int = 1,
+    ) -> np.ndarray:
+        postings, unseen = self.inverted(choices)
+        vectors = self.vectorize(queries, dict(unseen))
+        starts = np.searchsorted(postings.terms, vectors.terms, side="left")
+        lengths = np.searchsorted(postings.terms, vectors.terms, side="right") - starts
+        ends = np.cumsum(lengths)
+        sums = np.zeros(len(queries) * len(choices), dtype=np.float64)
+        # Each expanded entry takes a few arrays of 8 bytes, so a quarter as many entries as
+        # cells take about as much memory as the sums. A single query entry expands to at most
+        # one posting per choice, so every batch makes progress.
+        budget = max(len(choices), len(sums) // 4)
+        start = 0
+        while start < len(lengths):
+            done = int(ends[start - 1]) if start > 0 else 0
+            end = max(start + 1, int(np.searchsorted(ends, done + budget, "right")))
+            counts = lengths[start:end]
+            rows = vectors.rows[start:end]
+            # Expand each query entry into the postings of its term.
+            offsets = np.repeat(
+                starts[start:end] - (np.cumsum(counts) - counts), counts
+            )
+            positions = np.arange(offsets.size) + offsets
+            # Entries are sorted by row, so the batch only adds to the cells of its rows.
+            first = int(rows[0]) * len(choices)
+            last = (int(rows[-1]) + 1) * len(choices)
+            cells = np.repeat(rows, counts) * len(choices) + postings.rows[positions]
+            sums[first:last] += np.bincount(
+                cells - first,
+                weights=np.repeat(vectors.weights[start:end], counts)
+                * postings.weights[positions],
+                minlength=last - first,
+            )
+            start = end
+        sums *= 100
+        scores = np.minimum(sums, 100, out=sums).astype(np.float32)
+        del sums
+        scores[scores < score_cutoff] = 0
+        return scores.reshape(len(queries), len(choices))
+
+    def cpdist(
+        self, queries: List[str], choices: List[str], workers: int = 1
+    ) -> np.ndarray:
+        unseen: Dict[str, int] = {}
+        query_vectors = self.vectorize(queries, unseen)
+        choice_vectors = self.vectorize(choices, unseen)
+        width = max(1, len(self.vocabulary) + len(unseen))
+        # Match the entries of each query and choice pair by term.
+        _, query_entries, choice_entries = np.intersect1d(
+            query_vectors.rows * width + query_vectors.terms,
+            choice_vectors.rows * width + choice_vectors.terms,
+            assume_unique=True,
+            return_indices=True,
+        )
+        scores = np.bincount(
+            query_vectors.rows[query_entries],
+            weights=query_vectors.weights[query_entries]
+            * choice_vectors.weights[choice_entries],
+            minlength=len(queries),
+        )
+        return np.minimum(scores * 100, 100).astype(np.float32)
+
+
+DEFAULT_MATCHER = RapidfuzzMatcher("ratio", fuzz.ratio, exact=True)
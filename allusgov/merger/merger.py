@@ -1,12 +1,14 @@
 from logging import Logger
-from typing import Dict, List, Tuple, cast
+from typing import Dict, Iterable, List, Optional, Set, Tuple, cast
 
+import numpy as np
 import polars as pl
 from bigtree import levelorder_iter
 from bigtree.node.node import Node
-from rapidfuzz import process, utils
 
 from ..utils.utils import full_name
+from .matcher import DEFAULT_MATCHER, Matcher
+from .similarity import ProcessedNames, Similarity, SimilarityCache
 
 
 class Merger:
@@ -19,6 +21,17 @@ class Merger:
         base_name (str): Source name for the base tree.
         source_tree (Node): Source tree to be merged.
         source_name (str): Source name for the source tree.
+        threshold (int): Minimum score for a candidate to be merged.
+        cache (SimilarityCache): Optional on-disk cache of similarity candidates.
+        blocking (str): Blocking key type used to prune pairs before scoring, or None.
+        blocking_fallback (bool): Whether to score all base names for names with no blocked pairs.
+        memory_limit (int): Optional limit on the memory used for string similarity, in bytes.
+        matcher (Matcher): String matcher used to score names.
+        name_field (str): Name attribute to match on, such as name or normalized_name.
+        processed_names (ProcessedNames): Optional table of processed names shared between merges.
+        similarity (Similarity): Optional similarity calculated against an earlier base tree.
+        decisions (list): Source organization, its path in the source tree, selected base
+            organization and score of each decision applied, in order.
     """
 
     def __init__(
@@ -29,6 +42,14 @@ class Merger:
         source_tree: Node,
         source_name: str,
         threshold: int,
+        cache: Optional[SimilarityCache] = None,
+        blocking: Optional[str] = None,
+        blocking_fallback: bool = True,
+        similarity: Optional[Similarity] = None,
+        memory_limit: Optional[int] = None,
+        matcher: Matcher = DEFAULT_MATCHER,
+        name_field: str = "name",
+        processed_names: Optional[ProcessedNames] = None,
     ) -> None:
         self.logger = logger
         self.base_tree = base_tree
@@ -36,17 +57,50 @@ class Merger:
         self.source_tree = source_tree
         self.source_name = source_name
         self.threshold = threshold
-        self.source_names = self.name_list(self.source_tree, self.source_name)
-        self.base_names = self.name_list(self.base_tree, self.base_name)
-        self.similarity = self.calculate_similarity()
+        self.cache = cache
+        self.blocking = blocking
+        self.blocking_fallback = blocking_fallback
+        self.memory_limit = memory_limit
+        self.matcher = matcher
+        self.name_field = name_field
+        self.processed_names = processed_names
+        self.decisions: List[Tuple[Node, str, Node, float]] = []
+        self.source_names = self.name_list(
+            self.source_tree, self.source_name, self.name_field
+        )
+        self.base_names = self.name_list(
+            self.base_tree, self.base_name, self.name_field
+        )
+        # Level order position of each organization, before any changes.
+        self.source_index = {
+            cast(Node, org): i
+            for i, org in enumerate(levelorder_iter(self.source_tree))
+        }
+        self.base_index = {
+            cast(Node, org): i for i, org in enumerate(levelorder_iter(self.base_tree))
+        }
+        if similarity is None:
+            self.similarity = self.calculate_similarity()
+        else:
+            # Only names added to the base tree since the similarity was calculated need scoring.
+            similarity.processed_names = self.processed_names
+            added = similarity.rebase(list(self.base_names.keys()))
+            self.logger.info(
+                f"Rescored {self.source_name} against {added} names added to the base tree"
+            )
+            self.similarity = similarity
 
-    def name_list(self, tree: Node, source_name: str) -> Dict[str, List[Node]]:
+    @staticmethod
+    def name_list(
+        tree: Node, source_name: str, field: str = "name"
+    ) -> Dict[str, List[Node]]:
         """
         Generate a dictionary of names and their corresponding nodes in a tree.
 
         Args:
             tree (Node): Tree to extract names from.
             source_name (str): Source name for the tree.
+            field (str): Name attribute to read.
 
         Returns:
             dict: Dictionary of names and their corresponding nodes.
@@ -54,78 +108,173 @@ class Merger:
         names: Dict[str, List[Node]] = {}
         for org in levelorder_iter(tree):
             org = cast(Node, org)
-            name = full_name(org, source_name)
+            name = full_name(org, source_name, field)
             if name not in names:
                 names[name] = []
             names[name].append(org)
         return names
 
-    def calculate_similarity(self) -> pl.DataFrame:
+    def calculate_similarity(self) -> Similarity:
+        """
+        Set up string similarity for the source tree against the base tree.
+
+        Candidates are calculated by calculate_candidates, or on first use.
+
+        Returns:
+            Similarity: Top candidates for each source name.
+        """
+        return self.source_similarity(
+            list(self.source_names.keys()),
+            list(self.base_names.keys()),
+            self.threshold,
+            self.cache,
+            self.blocking,
+            self.blocking_fallback,
+            self.memory_limit,
+            self.matcher,
+            self.processed_names,
+        )
+
+    @staticmethod
+    def source_similarity(
+        source_names: List[str],
+        base_names: List[str],
+        threshold: int,
+        cache: Optional[SimilarityCache] = None,
+        blocking: Optional[str] = None,
+        blocking_fallback: bool = True,
+        memory_limit: Optional[int] = None,
+        matcher: Matcher = DEFAULT_MATCHER,
+        processed_names: Optional[ProcessedNames] = None,
+    ) -> Similarity:
         """
-        Calculate string similarity for the source tree against the base tree.
+        Set up string similarity between source and base names for a merge at the given threshold.
+
+        Args:
+            source_names (list): Source names.
+            base_names (list): Base names.
+            threshold (int): Minimum score for a candidate to be merged.
+            cache (SimilarityCache): Optional on-disk cache of similarity candidates.
+            blocking (str): Blocking key type used to prune pairs before scoring, or None.
+            blocking_fallback (bool): Whether to score all base names for names with no blocked pairs.
+            memory_limit (int): Optional limit on the memory used for string similarity, in bytes.
+            matcher (Matcher): String matcher used to score names.
+            processed_names (ProcessedNames): Optional table of processed names shared between merges.
 
         Returns:
-            pl.DataFrame: Similarity dataframe.
+            Similarity: Top candidates for each source name.
+        """
+        # Keep up to 5 matches with a score greater than 80% of the threshold.
+        return Similarity(
+            source_names,
+            base_names,
+            cutoff=threshold * 0.8,
+            limit=5,
+            cache=cache,
+            blocking=blocking,
+            blocking_fallback=blocking_fallback,
+            memory_limit=memory_limit,
+            matcher=matcher,
+            processed_names=processed_names,
+        )
+
+    def calculate_candidates(self, source_orgs: List[Node]) -> None:
+        """
+        Calculate string similarity candidates for the given source organizations.
+
+        Args:
+            source_orgs (list): Source organization nodes.
         """
         self.logger.info(
             f"Calculating string similarity for {self.source_name} against the base tree..."
         )
-        matrix = process.cdist(
-            self.source_names, self.base_names, processor=utils.default_process
-        )
-        similarity = pl.DataFrame(
-            matrix, schema=list(self.base_names.keys())
-        ).transpose(
-            include_header=True,
-            header_name="base",
-            column_names=list(self.source_names.keys()),
+        self.similarity.calculate(
+            [
+                self.similarity.rows[
+                    full_name(source_org, self.source_name, self.name_field)
+                ]
+                for source_org in source_orgs
+            ]
         )
-        return similarity
+        if self.similarity.pruning is not None and self.similarity.recall is not None:
+            self.logger.info(
+                f"Blocking by {self.blocking} skipped {self.similarity.pruning:.1%} of pairs "
+                + f"with {self.similarity.recall:.1%} sampled recall against a full scan"
+            )
+
+    def resolve_exact(self, source_orgs: List[Node]) -> Dict[Node, Tuple[Node, float]]:
+        """
+        Select candidates for source organizations with exact name matches, without fuzzy scoring.
+
+        Base names with an identical processed name score 100, so they are always the best
+        candidates by name. If they fill all the candidate slots, or one of them still scores
+        100 once parent scores are incorporated, no fuzzy match can be selected over it.
+
+        Args:
+            source_orgs (list): Source organization nodes.
 
-    def get_candidates(self, source_org_name: str) -> Dict[Node, float]:
+        Returns:
+            dict: Selected base organization and score for each resolved source organization.
+        """
+        resolved = {}
+        for source_org in source_orgs:
+            source_org_name = full_name(source_org, self.source_name, self.name_field)
+            # Ties between candidates are broken by base name, descending.
+            exact = sorted(self.similarity.exact_matches(source_org_name), reverse=True)
+            if len(exact) == 0:
+                continue
+            candidates = {}
+            for base in exact[: self.similarity.limit]:
+                for base_org in self.base_names[base]:
+                    candidates[base_org] = 100.0
+            selection, score = self.process_candidates(candidates, source_org)
+            if len(exact) >= self.similarity.limit or score >= 100:
+                resolved[source_org] = (selection, score)
+        return resolved
+
+    def get_candidates(
+        self,
+        source_org_name: str,
+        similarity: Optional[Similarity] = None,
+        base_names: Optional[Dict[str, List[Node]]] = None,
+    ) -> Dict[Node, float]:
         """
         Get candidates for a given source organization name.
 
         Args:
             source_org_name (str): Source organization name.
-            similarity (polars.DataFrame): Similarity DataFrame.
+            similarity (Similarity): Similarity to read from, if not the whole base tree.
+            base_names (dict): Base names and nodes that similarity was calculated against.
 
         Returns:
             dict: Dictionary of candidate base organizations and their scores.
         """
+        if similarity is None or base_names is None:
+            similarity = self.similarity
+            base_names = self.base_names
         candidates = {}
-        matches = (
-            # Return up to 5 matches with a score greater than 80% of the threshold.
-            self.similarity.select(["base", source_org_name])
-            .filter(pl.col(source_org_name) > (self.threshold * 0.8))
-            .sort([source_org_name, "base"], descending=True)
-            .head(5)
-        )
-        for match in matches.rows():  # pylint: disable=not-an-iterable
-            base = match[0]
-            score = match[1]
-            base_orgs = self.base_names[base]
+        for base, score in similarity.candidates(source_org_name):
+            base_orgs = base_names[base]
             for base_org in base_orgs:
                 candidates[base_org] = score
         return candidates
 
-    def process_candidates(
+    def score_candidates(
         self, candidates: Dict[Node, float], source_org: Node
-    ) -> Tuple[Node, float]:
+    ) -> Dict[Node, float]:
         """
-        Process candidates for a given source organization, incorparating parent scores.
+        Score candidates for a given source organization, incorparating parent scores.
 
         This handles the common case where different offices or programs will have identical (or nearly identical)
         names across multiple places in the tree. Adding in the parent scores makes it more likely we will merge
         the organization in at the right location.
 
         Args:
-            candidates (dict): Dictionary of candidate base organizations and their scores.
+            candidates (dict): Dictionary of candidate base organizations and their scores, updated in place.
             source_org (Node): Source organization node.
 
         Returns:
-            Node: Selected base organization to merge.
-            float: Score of the selected base organization.
+            dict: Dictionary of candidate base organizations and their weighted scores.
         """
         for base_org, score in candidates.items():
             if source_org.is_root or base_org.is_root:
@@ -145,14 +294,13 @@ class Merger:
                 factor = factor * 0.5
                 # Look up the score between the current pair of orgs.
                 current_source_org_name = full_name(
-                    current_source_org, self.source_name
+                    current_source_org, self.source_name, self.name_field
+                )
+                current_base_org_name = full_name(
+                    current_base_org, self.base_name, self.name_field
                 )
-                current_base_org_name = full_name(current_base_org, self.base_name)
-                parent_score = (  # pylint: disable-next=unsubscriptable-object
-                    self.similarity.select(["base", current_source_org_name])
-                    .filter(pl.col("base") == current_base_org_name)
-                    .head(1)
-                    .rows()[0][1]
+                parent_score = self.similarity.score(
+                    current_source_org_name, current_base_org_name
                 )
                 # Add this score to the candidate score, weighted by the factor.
                 candidates[base_org] = (
@@ -165,6 +313,23 @@ class Merger:
                 # Set the current orgs to the next level of parents.
                 current_source_org = cast(Node, current_source_org.parent)
                 current_base_org = cast(Node, current_base_org.parent)
+        return candidates
+
+    def process_candidates(
+        self, candidates: Dict[Node, float], source_org: Node
+    ) -> Tuple[Node, float]:
+        """
+        Process candidates for a given source organization, selecting the best weighted score.
+
+        Args:
+            candidates (dict): Dictionary of candidate base organizations and their scores.
+            source_org (Node): Source organization node.
+
+        Returns:
+            Node: Selected base organization to merge.
+            float: Score of the selected base organization.
+        """
+        candidates = self.score_candidates(candidates, source_org)
 
         # Select the candidate with the highest score.
         selection = sorted(candidates.items(), key=lambda x: x[1], reverse=True)[0][0]
@@ -172,6 +337,108 @@ class Merger:
 
         return selection, score
 
+    def ancestor_arrays(
+        self, index: Dict[Node, int], source_name: str, positions: Dict[str, int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generate arrays of the parent and the similarity position of each organization in a tree.
+
+        Args:
+            index (dict): Level order position of each organization in the tree.
+            source_name (str): Source name for the tree.
+            positions (dict): Similarity row or column of each name.
+
+        Returns:
+            np.ndarray: Position of the parent of each organization, or -1 for the root.
+            np.ndarray: Similarity row or column of the name of each organization.
+        """
+        parents = np.full(len(index), -1, dtype=np.int64)
+        names = np.empty(len(index), dtype=np.int64)
+        for org, i in index.items():
+            if org.parent is not None:
+                parents[i] = index[cast(Node, org.parent)]
+            names[i] = positions[full_name(org, source_name, self.name_field)]
+        return parents, names
+
+    def select_candidates(
+        self, source_orgs: List[Node]
+    ) -> Dict[Node, Tuple[Node, float]]:
+        """
+        Select candidates for many source organizations at once, as process_candidates would.
+
+        The candidates of all the source organizations are weighted by their parent scores
+        together: each step up the trees is a single array operation over every pair of
+        candidates that has not reached a root yet. This relies on the trees not changing
+        until all the selections are made.
+
+        Args:
+            source_orgs (list): Source organization nodes.
+
+        Returns:
+            dict: Selected base organization and score for each source organization with candidates.
+        """
+        source_parents, source_rows = self.ancestor_arrays(
+            self.source_index, self.source_name, self.similarity.rows
+        )
+        base_parents, base_columns = self.ancestor_arrays(
+            self.base_index, self.base_name, self.similarity.base_columns
+        )
+        # Flatten the candidates of every source organization, in candidate order.
+        orgs: List[Node] = []
+        counts: List[int] = []
+        pair_sources: List[int] = []
+        pair_bases: List[Node] = []
+        pair_scores: List[float] = []
+        for source_org in source_orgs:
+            source_org_name = full_name(source_org, self.source_name, self.name_field)
+            candidates = self.get_candidates(source_org_name)
+            if len(candidates) == 0:
+                self.logger.debug(f"No candidates for {source_org_name}")
+                continue
+            self.logger.debug(f"Checking {len(candidates)} for {source_org_name}")
+            orgs.append(source_org)
+            counts.append(len(candidates))
+            pair_sources.extend([self.source_index[source_org]] * len(candidates))
+            pair_bases.extend(candidates.keys())
+            pair_scores.extend(candidates.values())
+        if len(orgs) == 0:
+            return {}
+        scores = np.array(pair_scores, dtype=np.float64)
+        current_source = source_parents[np.array(pair_sources, dtype=np.int64)]
+        current_base = base_parents[
+            np.array([self.base_index[base] for base in pair_bases], dtype=np.int64)
+        ]
+        # Pairs where either organization is a root have no parents to check.
+        active = np.flatnonzero((current_source >= 0) & (current_base >= 0))
+        factor = 0.5
+        while True:
+            # Until one of the trees reaches the root, keep going up.
+            active = active[
+                (source_parents[current_source[active]] >= 0)
+                & (base_parents[current_base[active]] >= 0)
+            ]
+            if len(active) == 0:
+                break
+            factor = factor * 0.5
+            parent_scores = self.similarity.scores_for(
+                source_rows[current_source[active]], base_columns[current_base[active]]
+            )
+            scores[active] = (scores[active] + (parent_scores * factor)) / (1 + factor)
+            current_source[active] = source_parents[current_source[active]]
+            current_base[active] = base_parents[current_base[active]]
+
+        # Select the first candidate with the highest score for each source organization.
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        best = np.maximum.reduceat(scores, starts)
+        positions = np.where(
+            scores == np.repeat(best, counts), np.arange(len(scores)), len(scores)
+        )
+        first = np.minimum.reduceat(positions, starts)
+        return {
+            source_org: (pair_bases[i], float(scores[i]))
+            for source_org, i in zip(orgs, first)
+        }
+
     def merge(self) -> Node:
         """
         Merge the source tree into the base tree based on string similarity.
@@ -179,6 +446,17 @@ class Merger:
         Returns:
             Node: Merged base tree.
         """
+        self.apply_all(self.plan())
+        return self.base_tree
+
+    def plan(self) -> List[Tuple[Node, Node, float]]:
+        """
+        Decide where each source organization would be merged, without changing either tree.
+
+        Returns:
+            list: Source organization, selected base organization and score of each decision,
+                in the order merge applies them.
+        """
         self.logger.info(
             f"Checking for {self.source_name} matches against the base tree..."
         )
@@ -186,17 +464,55 @@ class Merger:
             cast(Node, source_org) for source_org in levelorder_iter(self.source_tree)
         ]
         source_orgs.reverse()
+        resolved = self.resolve_exact(source_orgs)
+        self.logger.info(
+            f"Exact-match fast path resolved {len(resolved)} of {len(source_orgs)} "
+            + f"{self.source_name} organizations"
+        )
+        unresolved = [
+            source_org for source_org in source_orgs if source_org not in resolved
+        ]
+        self.calculate_candidates(unresolved)
+        selected = self.select_candidates(unresolved)
 
-        for source_org in source_orgs:
-            source_org_name = full_name(source_org, self.source_name)
-            candidates = self.get_candidates(source_org_name)
-            if len(candidates) == 0:
-                self.logger.debug(f"No candidates for {source_org_name}")
-                continue
+        chosen = {**selected, **resolved}
+        return [
+            (source_org, *chosen[source_org])
+            for source_org in source_orgs
+            if source_org in chosen
+        ]
 
-            self.logger.debug(f"Checking {len(candidates)} for {source_org_name}")
-            selection, score = self.process_candidates(candidates, source_org)
+    def apply(self, source_org: Node, selection: Node, score: float) -> None:
+        """
+        Merge a source organization into the selected base organization, if it scores above the threshold.
+
+        Args:
+            source_org (Node): Source organization node.
+            selection (Node): Selected base organization node.
+            score (float): Score of the selected base organization.
+        """
+        self.apply_all([(source_org, selection, score)])
+
+    def apply_all(self, decisions: Iterable[Tuple[Node, Node, float]]) -> None:
+        """
+        Apply decisions in order, merging each source organization that scores above the threshold.
+
+        Attributes are merged as each decision is applied, but the children of merged source
+        organizations are only moved once all decisions are applied, with one assignment per
+        selected base organization. Since the children of a source organization are not moved
+        before it is applied, and base organizations are never moved, this gives the same tree as
+        moving them one by one. The children of each base organization are validated once, rather
+        than once for every child moved into it.
 
+        Args:
+            decisions (iterable): Source organization, selected base organization and score of
+                each decision, in the order to apply them.
+        """
+        moves: Dict[Node, List[Node]] = {}
+        merged: List[Node] = []
+        for source_org, selection, score in decisions:
+            # No organization has moved yet, so this is still its path in the source tree.
+            self.decisions.append((source_org, source_org.path_name, selection, score))
             if score > self.threshold:
                 self.logger.info(
                     f"{score:.1f}: Selected candidate {selection.path_name} for {source_org.path_name}"
@@ -205,15 +521,210 @@ class Merger:
                 selection.set_attrs(
                     {self.source_name: source_org.get_attr(self.source_name)}
                 )
-                # Merge children
+                # Merge children, once every decision is applied.
                 for child in source_org.children:
                     self.logger.debug(
                         f"Merging child {child.path_name} into {selection.path_name}"
                     )
-                    child.parent = selection
+                    moves.setdefault(selection, []).append(child)
+                if len(source_org.children) > 0:
+                    merged.append(source_org)
             else:
                 self.logger.debug(
                     f"{score:.1f}: Skipped candidate {selection.path_name} for {source_org.path_name}"
                 )
+        for source_org in merged:
+            del source_org.children
+        for selection, children in moves.items():
+            selection.children = list(selection.children) + children
+
+    def decision_table(
+        self, plan: Optional[List[Tuple[Node, Node, float]]] = None
+    ) -> pl.DataFrame:
+        """
+        Return the decisions applied so far, or the decisions of a plan, in order.
+
+        Organizations are identified by their level order position in the source tree and in the
+        base tree before the merge, as paths are not always unique. The score of each decision is
+        split into the similarity of the names and the contribution of their ancestors.
 
+        Args:
+            plan (list): Decisions from plan, which must not have been applied yet.
+
+        Returns:
+            pl.DataFrame: Source and selected base organization, scores and outcome of each decision.
+        """
+        if plan is None:
+            decisions = self.decisions
+        else:
+            decisions = [
+                (source_org, source_org.path_name, selection, score)
+                for source_org, selection, score in plan
+            ]
+        name_scores = self.similarity.scores_for(
+            np.array(
+                [
+                    self.similarity.rows[
+                        full_name(d[0], self.source_name, self.name_field)
+                    ]
+                    for d in decisions
+                ],
+                dtype=np.int64,
+            ),
+            np.array(
+                [
+                    self.similarity.base_columns[
+                        full_name(d[2], self.base_name, self.name_field)
+                    ]
+                    for d in decisions
+                ],
+                dtype=np.int64,
+            ),
+        )
+        return pl.DataFrame(
+            {
+                "source_index": [self.source_index[d[0]] for d in decisions],
+                "source_path": [d[1] for d in decisions],
+                "base_index": [self.base_index[d[2]] for d in decisions],
+                "base_path": [d[2].path_name for d in decisions],
+                "name_score": name_scores,
+                "ancestor_contribution": [
+                    d[3] - name_score for d, name_score in zip(decisions, name_scores)
+                ],
+                "score": [d[3] for d in decisions],
+                "merged": [d[3] > self.threshold for d in decisions],
+            },
+            schema={
+                "source_index": pl.Int64,
+                "source_path": pl.Utf8,
+                "base_index": pl.Int64,
+                "base_path": pl.Utf8,
+                "name_score": pl.Float64,
+                "ancestor_contribution": pl.Float64,
+                "score": pl.Float64,
+                "merged": pl.Boolean,
+            },
+        )
+
+    def replay(self, decisions: pl.DataFrame) -> Node:
+        """
+        Merge the source tree into the base tree by applying decisions from an earlier merge.
+
+        The decisions must come from decision_table, for a merge of identical trees.
+
+        Args:
+            decisions (pl.DataFrame): Decisions to apply, in order.
+
+        Returns:
+            Node: Merged base tree.
+        """
+        self.logger.info(
+            f"Replaying {len(decisions)} stored {self.source_name} merge decisions..."
+        )
+        source_orgs = list(self.source_index.keys())
+        base_orgs = list(self.base_index.keys())
+        self.apply_all(
+            (source_orgs[source_index], base_orgs[base_index], score)
+            for source_index, base_index, score in decisions.select(
+                "source_index", "base_index", "score"
+            ).iter_rows()
+        )
         return self.base_tree
+
+    def sweep(self, thresholds: List[int]) -> Tuple[pl.DataFrame, pl.DataFrame]:
+        """
+        Report the merge decisions for each threshold from a single scoring pass.
+
+        Candidates are scored once, at the lowest threshold. Since no tree is changed during the
+        sweep, the candidates kept at a higher threshold are a prefix of those, with the same
+        weighted scores. The Merger must be created with a threshold no higher than the lowest
+        swept threshold.
+
+        Args:
+            thresholds (list): Thresholds to report on.
+
+        Returns:
+            pl.DataFrame: Selected candidate for each source organization at each threshold.
+            pl.DataFrame: Number of matches and nodes added to the base tree at each threshold.
+        """
+        self.logger.info(
+            f"Sweeping {self.source_name} thresholds against the base tree..."
+        )
+        source_orgs = [
+            cast(Node, source_org) for source_org in levelorder_iter(self.source_tree)
+        ]
+        self.calculate_candidates(source_orgs)
+        decisions: Dict[str, List] = {
+            "threshold": [],
+            "source": [],
+            "source_path": [],
+            "base_path": [],
+            "candidate_score": [],
+            "score": [],
+            "merged": [],
+        }
+        merged: Dict[int, Set[Node]] = {threshold: set() for threshold in thresholds}
+        for source_org in reversed(source_orgs):
+            candidates = self.get_candidates(
+                full_name(source_org, self.source_name, self.name_field)
+            )
+            if len(candidates) == 0:
+                continue
+            candidate_scores = dict(candidates)
+            scores = self.score_candidates(candidates, source_org)
+            for threshold in thresholds:
+                # Candidates are ordered by name score, so those above the cutoff come first.
+                eligible = [
+                    (base_org, score)
+                    for base_org, score in scores.items()
+                    if candidate_scores[base_org] > threshold * 0.8
+                ]
+                if len(eligible) == 0:
+                    continue
+                selection, score = sorted(eligible, key=lambda x: x[1], reverse=True)[0]
+                decisions["threshold"].append(threshold)
+                decisions["source"].append(self.source_name)
+                decisions["source_path"].append(source_org.path_name)
+                decisions["base_path"].append(selection.path_name)
+                decisions["candidate_score"].append(candidate_scores[selection])
+                decisions["score"].append(score)
+                decisions["merged"].append(score > threshold)
+                if score > threshold:
+                    merged[threshold].add(source_org)
+
+        return pl.DataFrame(decisions), self.sweep_summary(source_orgs, merged)
+
+    def sweep_summary(
+        self, source_orgs: List[Node], merged: Dict[int, Set[Node]]
+    ) -> pl.DataFrame:
+        """
+        Count the matches and the nodes added to the base tree at each swept threshold.
+
+        Args:
+            source_orgs (list): Source organizations, in level order.
+            merged (dict): Source organizations merged at each threshold.
+
+        Returns:
+            pl.DataFrame: Number of matches and nodes added to the base tree at each threshold.
+        """
+        summary: Dict[str, List] = {
+            "threshold": [],
+            "source": [],
+            "matches": [],
+            "nodes_added": [],
+        }
+        for threshold in merged:
+            # An org is moved into the base tree if its parent was matched or moved.
+            # Matched orgs are moved too, as they are still children of their source parent.
+            added: Set[Node] = set()
+            for source_org in source_orgs:
+                parent = source_org.parent
+                if parent is not None and (
+                    parent in merged[threshold] or parent in added
+                ):
+                    added.add(source_org)
+            summary["threshold"].append(threshold)
+            summary["source"].append(self.source_name)
+            summary["matches"].append(len(merged[threshold]))
+            summary["nodes_added"].append(len(added))
+        return pl.DataFrame(summary)
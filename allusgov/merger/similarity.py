@@ -0,0 +1,718 @@
+import hashlib
+import json
+import os
+import tempfile
+from logging import Logger
+from typing import Dict, Iterator, List, Optional, Tuple, cast
+
+import numpy as np
+import rapidfuzz
+
+from .blocking import BlockingIndex
+from .matcher import DEFAULT_MATCHER, Matcher
+
+
+class SimilarityCache:
+    """
+    Size-bounded on-disk cache of similarity candidates.
+
+    Each entry is stored as a .npy file that is memory-mapped when loaded, alongside a small JSON
+    file recording the cutoff it was calculated with. Entries record which rows were calculated,
+    as rows resolved by exact matching are skipped. Entries are keyed by a hash of the ordered
+    source and base names, the matcher and the candidate limit, so the same entry
+    serves any cutoff at or above the one it was calculated with. When the cache grows beyond
+    max_size bytes the least recently used entries are evicted. A read-only cache loads entries
+    without marking them as used, and saves nothing.
+
+    Attributes:
+        logger (logging.Logger): Logger object for logging messages.
+        path (str): Directory to store cache entries in.
+        max_size (int): Maximum total size of the cache entries, in bytes.
+        read_only (bool): Whether to leave the cache directory untouched.
+    """
+
+    def __init__(
+        self, logger: Logger, path: str, max_size: int, read_only: bool = False
+    ) -> None:
+        self.logger = logger
+        self.path = path
+        self.max_size = max_size
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(path, exist_ok=True)
+
+    def key(self, similarity: "Similarity") -> str:
+        """Return the cache key for the given similarity inputs."""
+        digest = hashlib.sha256()
+        for part in [
+            rapidfuzz.__version__,
+            similarity.matcher.name,
+            str(similarity.limit),
+            str(similarity.blocking),
+            str(similarity.blocking_fallback),
+        ]:
+            digest.update(part.encode("utf-8") + b"\0")
+        for names in [similarity.source_names, similarity.base_names]:
+            digest.update(hashlib.sha256("\0".join(names).encode("utf-8")).digest())
+        return digest.hexdigest()
+
+    def entry_path(self, key: str, ext: str) -> str:
+        return self.path + "/" + key + "." + ext
+
+    def load(
+        self, key: str, cutoff: float
+    ) -> Optional[Tuple[float, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Load a cache entry, if one exists that was calculated at or below the given cutoff.
+
+        Returns:
+            float: Cutoff the entry was calculated with.
+            np.ndarray: Memory-mapped candidate base name indexes for each row.
+            np.ndarray: Memory-mapped candidate scores for each row.
+            np.ndarray: Memory-mapped flags for the rows that were calculated.
+        """
+        try:
+            with open(self.entry_path(key, "json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["cutoff"] > cutoff:
+                return None
+            candidates = np.load(self.entry_path(key, "npy"), mmap_mode="r")
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        if not self.read_only:
+            # Mark the entry as recently used.
+            os.utime(self.entry_path(key, "npy"))
+        self.logger.info(f"Loaded cached string similarity {key[:12]}")
+        return (
+            meta["cutoff"],
+            candidates["column"],
+            candidates["score"],
+            candidates["calculated"][:, 0],
+        )
+
+    def save(
+        self,
+        key: str,
+        cutoff: float,
+        columns: np.ndarray,
+        scores: np.ndarray,
+        calculated: np.ndarray,
+    ) -> None:
+        """Save a cache entry, then evict old entries if the cache is over its size limit."""
+        if self.read_only:
+            return
+        # Write to temporary files and rename, so a partial entry is never loaded.
+        candidates = np.lib.format.open_memmap(
+            self.entry_path(key, "npy.tmp"),
+            mode="w+",
+            dtype=[("column", np.int32), ("score", np.float32), ("calculated", bool)],
+            shape=columns.shape,
+        )
+        candidates["column"] = columns
+        candidates["score"] = scores
+        candidates["calculated"] = calculated[:, np.newaxis]
+        candidates.flush()
+        del candidates
+        with open(self.entry_path(key, "json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"cutoff": cutoff, "shape": list(columns.shape)}, f)
+        os.replace(self.entry_path(key, "npy.tmp"), self.entry_path(key, "npy"))
+        os.replace(self.entry_path(key, "json.tmp"), self.entry_path(key, "json"))
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in max_size."""
+        entries = []
+        for file in os.listdir(self.path):
+            if file.endswith(".npy"):
+                try:
+                    stat = os.stat(self.path + "/" + file)
+                except FileNotFoundError:
+                    # Evicted by another process sharing the cache.
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file[: -len(".npy")]))
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_size:
+                break
+            self.logger.debug(f"Evicting cached string similarity {key[:12]}")
+            for ext in ["npy", "json"]:
+                try:
+                    os.remove(self.entry_path(key, ext))
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+
+class ProcessedNames:
+    """
+    Table of processed names, shared by the similarities of every merge against the same base.
+
+    Each name is processed once, the first time it is seen, and its processed form is appended
+    to a single UTF-8 buffer, with the end of each name in an offsets array. Merges against a
+    growing base tree then only process the names that are new to the table, and the table takes
+    one Python object per name for the index rather than two.
+
+    Attributes:
+        matcher (Matcher): Matcher whose processing is applied.
+        index (Dict[str, int]): Position of each name in the table.
+        buffer (bytearray): Processed form of each name, encoded and concatenated in the order
+            they were added.
+        offsets (np.ndarray): Start of each name in buffer, followed by the end of the last one.
+    """
+
+    def __init__(self, matcher: Matcher) -> None:
+        self.matcher = matcher
+        self.index: Dict[str, int] = {}
+        self.buffer = bytearray()
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def add(self, names: List[str]) -> None:
+        """Process and append the names not in the table yet."""
+        new = [name for name in dict.fromkeys(names) if name not in self.index]
+        if len(new) == 0:
+            return
+        encoded = [self.matcher.process(name).encode("utf-8") for name in new]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        self.offsets = np.concatenate(
+            (self.offsets, self.offsets[-1] + np.cumsum(lengths))
+        )
+        self.buffer += b"".join(encoded)
+        for name in new:
+            self.index[name] = len(self.index)
+
+    def lookup(self, names: List[str]) -> List[str]:
+        """
+        Return the processed form of each name, processing any names not in the table.
+
+        Args:
+            names (list): Names to look up.
+
+        Returns:
+            list: Processed names.
+        """
+        self.add(names)
+        positions = np.fromiter(
+            (self.index[name] for name in names), dtype=np.int64, count=len(names)
+        )
+        starts = self.offsets[positions].tolist()
+        ends = self.offsets[positions + 1].tolist()
+        return [
+            self.buffer[start:end].decode("utf-8") for start, end in zip(starts, ends)
+        ]
+
+
+class Similarity:
+    """
+    Sparse top-k string similarity between a list of source names and a list of base names.
+
+    Rather than keeping a dense source × base matrix, only the best `limit` base names scoring
+    above `cutoff` are kept for each source name, in compact arrays with one row per source name.
+    Rows are calculated in batches on request, or on first use. Scores for any other pair of
+    names are computed on demand with the same matcher, and memoized. If a cache is given,
+    calculated rows are loaded from it when possible instead of being calculated again.
+
+    With blocking, each source name is only scored against the base names that share a blocking
+    key with it (see BlockingIndex), falling back to all base names if it shares none. The share
+    of pairs that were skipped, and the recall of the candidates against a full scan of a sample
+    of source names, are then recorded in pruning and recall.
+
+    With a memory limit, chunks are sized so that scoring stays within half of it. If the
+    candidate arrays alone would take more than the other half, they are spilled to memory-mapped
+    temporary files. Processed names are not counted. Processed names are read from a shared
+    ProcessedNames table for the same matcher, if given.
+
+    Attributes:
+        source_names (List[str]): Source names, one per row.
+        base_names (List[str]): Base names, indexed by the values in columns.
+        cutoff (float): Minimum score (exclusive) for a base name to be kept as a candidate.
+        limit (int): Maximum number of candidates kept for each source name.
+        columns (np.ndarray): Base name indexes of the candidates for each row, padded with -1.
+        scores (np.ndarray): Scores of the candidates for each row, padded with 0.
+        calculated (np.ndarray): Whether the candidates for each row have been calculated.
+        rows (Dict[str, int]): Row index of each source name.
+        base_columns (Dict[str, int]): Column index of each base name.
+        blocking (str): Blocking key type, or None to score every pair.
+        blocking_fallback (bool): Whether to score all base names for names with no blocked pairs.
+        pruning (float): Share of pairs skipped by blocking, if calculated with blocking.
+        recall (float): Sampled recall of blocked candidates, if calculated with blocking.
+        spill (bool): Whether the candidate arrays are kept in temporary files.
+    """
+
+    def __init__(
+        self,
+        source_names: List[str],
+        base_names: List[str],
+        cutoff: float,
+        limit: int = 5,
+        matcher: Matcher = DEFAULT_MATCHER,
+        workers: int = -1,
+        chunk_cells: int = 2**24,
+        cache: Optional[SimilarityCache] = None,
+        blocking: Optional[str] = None,
+        blocking_fallback: bool = True,
+        recall_sample: int = 500,
+        memory_limit: Optional[int] = None,
+        processed_names: Optional[ProcessedNames] = None,
+    ) -> None:
+        self.source_names = source_names
+        self.base_names = base_names
+        self.cutoff = cutoff
+        self.limit = limit
+        self.matcher = matcher
+        self.processed_names = processed_names
+        self.workers = workers
+        self.chunk_cells = chunk_cells
+        self.cache = cache
+        self.blocking = blocking
+        self.blocking_fallback = blocking_fallback
+        self.recall_sample = recall_sample
+        self.pruning: Optional[float] = None
+        self.recall: Optional[float] = None
+        self.rows = {name: row for row, name in enumerate(source_names)}
+        self.base_columns = {name: column for column, name in enumerate(base_names)}
+        self.processed_source_names: Optional[List[str]] = None
+        self.processed_base_names: Optional[List[str]] = None
+        self.exact_names: Optional[Dict[str, List[str]]] = None
+        self.pair_scores: Dict[Tuple[int, int], float] = {}
+        self.spill = False
+        if memory_limit is not None:
+            self.chunk_cells = max(1, memory_limit // 2 // self.matcher.cell_bytes)
+            candidate_bytes = len(source_names) * (limit * 8 + 1)
+            self.spill = candidate_bytes > memory_limit // 2
+        self.columns = self.allocate((len(source_names), limit), np.int32, -1)
+        self.scores = self.allocate((len(source_names), limit), np.float32, 0)
+        self.calculated = self.allocate(len(source_names), bool, False)
+        self.cache_key: Optional[str] = None
+        self.cache_cutoff = cutoff
+        if cache is not None:
+            self.cache_key = cache.key(self)
+            cached = cache.load(self.cache_key, cutoff)
+            if cached is not None:
+                self.cache_cutoff, self.columns, self.scores, self.calculated = cached
+
+    def allocate(self, shape, dtype, fill) -> np.ndarray:
+        """
+        Allocate an array for candidate data, in a temporary file if spilling.
+
+        Args:
+            shape: Shape of the array.
+            dtype: Data type of the array.
+            fill: Value or array to fill the array with.
+
+        Returns:
+            np.ndarray: New array.
+        """
+        array: np.ndarray
+        if self.spill:
+            array = np.memmap(
+                tempfile.TemporaryFile(), dtype=dtype, mode="w+", shape=shape
+            )
+        else:
+            array = np.empty(shape, dtype=dtype)
+        array[...] = fill
+        return array
+
+    def calculate(self, rows: Optional[List[int]] = None) -> None:
+        """
+        Calculate the top-k candidates for the given rows, skipping any already calculated.
+
+        Without blocking, source names are scored in bounded chunks, see stream_candidates.
+
+        Args:
+            rows (list): Rows to calculate, or None for all rows.
+        """
+        if rows is None:
+            rows = list(range(len(self.source_names)))
+        rows = [row for row in rows if not self.calculated[row]]
+        if len(rows) == 0:
+            return
+        if not self.columns.flags.writeable:
+            # Copy rows loaded from the cache, so that new rows can be added.
+            self.columns = self.allocate(self.columns.shape, np.int32, self.columns)
+            self.scores = self.allocate(self.scores.shape, np.float32, self.scores)
+            self.calculated = self.allocate(
+                self.calculated.shape, bool, self.calculated
+            )
+        if len(self.base_names) > 0:
+            if self.processed_source_names is None:
+                self.process_names()
+            # Ties are broken by base name, descending.
+            name_rank = np.empty(len(self.base_names), dtype=np.int64)
+            name_rank[np.argsort(np.array(self.base_names, dtype=object))] = np.arange(
+                len(self.base_names)
+            )
+            if self.blocking is not None:
+                self.calculate_blocked(rows, name_rank)
+            else:
+                self.calculate_full(rows, name_rank)
+        self.calculated[rows] = True
+        if self.cache is not None:
+            # Rows calculated now are only valid at this cutoff and above.
+            self.cache_cutoff = self.cutoff
+            self.cache.save(
+                cast(str, self.cache_key),
+                self.cache_cutoff,
+                self.columns,
+                self.scores,
+                self.calculated,
+            )
+
+    def calculate_full(self, rows: List[int], name_rank: np.ndarray) -> None:
+        """
+        Calculate the top-k candidates for the given rows against all base names.
+
+        Args:
+            rows (list): Rows to calculate.
+            name_rank (np.ndarray): Sort position of each base name, for breaking ties.
+        """
+        all_columns = np.arange(len(self.base_names))
+        for row, columns, scores in self.stream_candidates(
+            rows, all_columns, name_rank
+        ):
+            self.set_row(row, columns, scores)
+
+    def stream_candidates(
+        self,
+        rows: List[int],
+        columns: np.ndarray,
+        name_rank: np.ndarray,
+        existing: bool = False,
+    ) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """
+        Score rows against base names in chunks of at most chunk_cells scores, yielding the top-k.
+
+        Rows are scored in chunks of rows. If a single row has more scores than fit in a chunk,
+        the base names are scored in blocks instead, and the top-k of each block is merged into
+        a running top-k for the row. Since ties are broken by base name, this selects the same
+        candidates as scoring the whole row at once.
+
+        Args:
+            rows (list): Rows to score.
+            columns (np.ndarray): Base name indexes to score the rows against.
+            name_rank (np.ndarray): Sort position of each base name, for breaking ties.
+            existing (bool): Whether to merge the stored candidates of each row into its top-k.
+
+        Yields:
+            int: Row.
+            np.ndarray: Up to limit base name indexes, best first.
+            np.ndarray: Score for each of the selected base names.
+        """
+        if len(columns) == 0:
+            return
+        source_names = cast(List[str], self.processed_source_names)
+        base_names = cast(List[str], self.processed_base_names)
+        block_size = max(1, min(len(columns), self.chunk_cells))
+        blocks = [
+            (block, [base_names[column] for column in block])
+            for block in (
+                columns[start : start + block_size]
+                for start in range(0, len(columns), block_size)
+            )
+        ]
+        chunk_rows = max(1, self.chunk_cells // block_size)
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start : start + chunk_rows]
+            best: List[Optional[Tuple[np.ndarray, np.ndarray]]] = []
+            for row in chunk:
+                if existing:
+                    kept = self.columns[row] >= 0
+                    best.append((self.columns[row][kept], self.scores[row][kept]))
+                else:
+                    best.append(None)
+            for block, block_names in blocks:
+                matrix = self.matcher.cdist(
+                    [source_names[row] for row in chunk],
+                    block_names,
+                    score_cutoff=self.cutoff,
+                    workers=self.workers,
+                )
+                for i, row_scores in enumerate(matrix):
+                    current = best[i]
+                    if current is None:
+                        best[i] = self.top_candidates(block, row_scores, name_rank)
+                    else:
+                        best[i] = self.top_candidates(
+                            np.concatenate([current[0], block]),
+                            np.concatenate([current[1], row_scores]),
+                            name_rank,
+                        )
+            for row, candidates in zip(chunk, best):
+                yield row, *cast(Tuple[np.ndarray, np.ndarray], candidates)
+
+    def calculate_blocked(self, rows: List[int], name_rank: np.ndarray) -> None:
+        """
+        Calculate the top-k candidates for the given rows, scoring only blocked pairs.
+
+        Args:
+            rows (list): Rows to calculate.
+            name_rank (np.ndarray): Sort position of each base name, for breaking ties.
+        """
+        source_names = cast(List[str], self.processed_source_names)
+        base_names = cast(List[str], self.processed_base_names)
+        index = BlockingIndex(base_names, cast(str, self.blocking))
+        all_columns = np.arange(len(base_names), dtype=np.int32)
+        pairs = 0
+        for row in rows:
+            name = source_names[row]
+            blocked = index.lookup(name)
+            if len(blocked) == 0 and self.blocking_fallback:
+                blocked = all_columns
+            if len(blocked) == 0:
+                continue
+            pairs += len(blocked)
+            row_scores = self.matcher.cdist(
+                [name],
+                [base_names[column] for column in blocked],
+                score_cutoff=self.cutoff,
+            )[0]
+            self.set_row(row, *self.top_candidates(blocked, row_scores, name_rank))
+        self.pruning = 1 - pairs / (len(rows) * len(base_names))
+
+        # Measure recall against a full scan of an evenly spaced sample of rows.
+        sample = [
+            rows[i]
+            for i in np.unique(
+                np.linspace(
+                    0, len(rows) - 1, min(len(rows), self.recall_sample)
+                ).astype(np.int64)
+            )
+        ]
+        expected = 0
+        found = 0
+        for row, matches, _ in self.stream_candidates(sample, all_columns, name_rank):
+            expected += len(matches)
+            found += len(np.intersect1d(matches, self.columns[row]))
+        self.recall = found / expected if expected > 0 else 1.0
+
+    def rebase(self, base_names: List[str]) -> int:
+        """
+        Switch to a larger list of base names, scoring only the names that were added.
+
+        The candidates of calculated rows are merged with the candidates among the added names,
+        which gives the same top-k as calculating those rows against the new list. Added names
+        are scored against every calculated row, without blocking. For matchers whose scores
+        depend on the names they were fitted to, every row is recalculated on request instead.
+
+        Args:
+            base_names (list): New base names, including all of the current base names.
+
+        Returns:
+            int: Number of base names added.
+        """
+        base_columns = {name: column for column, name in enumerate(base_names)}
+        added = [
+            column
+            for column, name in enumerate(base_names)
+            if name not in self.base_columns
+        ]
+        remap = np.array(
+            [base_columns[name] for name in self.base_names] + [-1], dtype=np.int32
+        )
+        # Padding columns of -1 map to the last entry, which stays -1.
+        columns = self.allocate(self.columns.shape, np.int32, -1)
+        np.take(remap, self.columns, out=columns)
+        scores = self.allocate(self.scores.shape, np.float32, self.scores)
+        self.base_names = base_names
+        self.base_columns = base_columns
+        self.processed_source_names = None
+        self.processed_base_names = None
+        self.exact_names = None
+        self.pair_scores = {}
+        self.columns = columns
+        self.scores = scores
+        self.calculated = self.allocate(self.calculated.shape, bool, self.calculated)
+        if self.matcher.corpus and len(added) > 0:
+            self.calculated[:] = False
+        rows = np.flatnonzero(self.calculated)
+        if len(added) > 0 and len(rows) > 0:
+            self.process_names()
+            name_rank = np.empty(len(base_names), dtype=np.int64)
+            name_rank[np.argsort(np.array(base_names, dtype=object))] = np.arange(
+                len(base_names)
+            )
+            for row, row_columns, row_scores in self.stream_candidates(
+                list(rows), np.array(added, dtype=np.int32), name_rank, existing=True
+            ):
+                self.set_row(row, row_columns, row_scores)
+        if self.cache is not None:
+            self.cache_key = self.cache.key(self)
+            if len(rows) > 0:
+                self.cache_cutoff = self.cutoff
+                self.cache.save(
+                    self.cache_key,
+                    self.cache_cutoff,
+                    self.columns,
+                    self.scores,
+                    self.calculated,
+                )
+        return len(added)
+
+    def set_row(self, row: int, columns: np.ndarray, scores: np.ndarray) -> None:
+        """Store the candidates for a row."""
+        self.columns[row] = -1
+        self.scores[row] = 0
+        self.columns[row, : len(columns)] = columns
+        self.scores[row, : len(scores)] = scores
+
+    def top_candidates(
+        self, columns: np.ndarray, scores: np.ndarray, name_rank: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Select the best candidates scoring above the cutoff, with ties broken by base name, descending.
+
+        Args:
+            columns (np.ndarray): Base name indexes that were scored.
+            scores (np.ndarray): Score for each of the columns.
+            name_rank (np.ndarray): Sort position of each base name.
+
+        Returns:
+            np.ndarray: Up to limit base name indexes, best first.
+            np.ndarray: Score for each of the selected base names.
+        """
+        matches = np.flatnonzero(scores > self.cutoff)
+        order = matches[np.lexsort((-name_rank[columns[matches]], -scores[matches]))]
+        order = order[: self.limit]
+        return columns[order], scores[order]
+
+    def candidates(self, source_name: str) -> List[Tuple[str, float]]:
+        """
+        Return the candidate base names for a source name, best first.
+
+        Args:
+            source_name (str): Source name.
+
+        Returns:
+            list: List of base names and their scores.
+        """
+        row = self.rows[source_name]
+        if not self.calculated[row]:
+            self.calculate([row])
+        return [
+            (self.base_names[column], float(score))
+            for column, score in zip(self.columns[row], self.scores[row])
+            if column >= 0 and score > self.cutoff
+        ]
+
+    def exact_matches(self, source_name: str) -> List[str]:
+        """
+        Return the base names with the same processed name as a source name.
+
+        This is a hash join on the processed names, so it needs no fuzzy scoring. Exact matches
+        are only returned for matchers that score identical strings, and only those, at 100.
+
+        Args:
+            source_name (str): Source name.
+
+        Returns:
+            list: Base names scoring 100 against the source name, in column order.
+        """
+        if not self.matcher.exact:
+            return []
+        if self.exact_names is None:
+            if self.processed_source_names is None:
+                self.process_names()
+            self.exact_names = {}
+            for name, processed in zip(
+                self.base_names, cast(List[str], self.processed_base_names)
+            ):
+                if processed not in self.exact_names:
+                    self.exact_names[processed] = []
+                self.exact_names[processed].append(name)
+        processed_names = cast(List[str], self.processed_source_names)
+        return self.exact_names.get(processed_names[self.rows[source_name]], [])
+
+    def process_names(self) -> None:
+        """Process every name once, so that pairs can be scored directly, and fit the matcher."""
+        if (
+            self.processed_names is not None
+            and self.processed_names.matcher.name == self.matcher.name
+        ):
+            self.processed_source_names = self.processed_names.lookup(self.source_names)
+            self.processed_base_names = self.processed_names.lookup(self.base_names)
+        else:
+            self.processed_source_names = [
+                self.matcher.process(name) for name in self.source_names
+            ]
+            self.processed_base_names = [
+                self.matcher.process(name) for name in self.base_names
+            ]
+        self.matcher = self.matcher.fit(
+            self.processed_source_names + self.processed_base_names
+        )
+
+    def scores_for(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        """
+        Return the similarity scores for pairs of rows and columns, as score would.
+
+        Each distinct pair is only looked up or scored once. Pairs that are not candidates are
+        scored in a single batch.
+
+        Args:
+            rows (np.ndarray): Source name row of each pair.
+            columns (np.ndarray): Base name column of each pair.
+
+        Returns:
+            np.ndarray: Similarity score of each pair.
+        """
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.float64)
+        pairs, inverse = np.unique(
+            rows.astype(np.int64) * len(self.base_names) + columns, return_inverse=True
+        )
+        pair_rows = pairs // len(self.base_names)
+        pair_columns = pairs % len(self.base_names)
+        matches = self.columns[pair_rows] == pair_columns[:, np.newaxis]
+        found = matches.any(axis=1)
+        scores = self.scores[pair_rows, matches.argmax(axis=1)].astype(np.float64)
+        missing = np.flatnonzero(~found)
+        if len(missing) > 0:
+            if self.processed_source_names is None:
+                self.process_names()
+            source_names = cast(List[str], self.processed_source_names)
+            base_names = cast(List[str], self.processed_base_names)
+            scores[missing] = self.matcher.cpdist(
+                [source_names[row] for row in pair_rows[missing]],
+                [base_names[column] for column in pair_columns[missing]],
+                workers=self.workers,
+            )
+        return scores[inverse]
+
+    def score(self, source_name: str, base_name: str) -> float:
+        """
+        Return the similarity score for a pair of names.
+
+        Pairs kept as candidates are read from the candidate arrays, other pairs are scored
+        from the processed names and memoized, since sibling candidates share the same ancestors.
+
+        Args:
+            source_name (str): Source name.
+            base_name (str): Base name.
+
+        Returns:
+            float: Similarity score, at the same precision as the candidate scores.
+        """
+        row = self.rows.get(source_name)
+        column = self.base_columns.get(base_name)
+        if self.processed_source_names is None:
+            self.process_names()
+        if row is None or column is None:
+            # Names outside the similarity data are scored directly.
+            return self.matcher.score(
+                self.matcher.process(source_name), self.matcher.process(base_name)
+            )
+        key = (row, column)
+        if key in self.pair_scores:
+            return self.pair_scores[key]
+        matches = np.flatnonzero(self.columns[row] == column)
+        if len(matches) > 0:
+            score = float(self.scores[row, matches[0]])
+        else:
+            score = self.matcher.score(
+                cast(List[str], self.processed_source_names)[row],
+                cast(List[str], self.processed_base_names)[column],
+            )
+        self.pair_scores[key] = score
+        return score
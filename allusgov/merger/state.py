@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from logging import Logger
+from typing import List, Optional, cast
+
+import polars as pl
+import rapidfuzz
+from bigtree import levelorder_iter
+from bigtree.node.node import Node
+
+from .. import __version__
+
+
+def tree_fingerprint(tree: Node) -> str:
+    """
+    Return a hash of the structure, names and attributes of a tree.
+
+    Args:
+        tree (Node): Tree to fingerprint.
+
+    Returns:
+        str: Hex digest of the tree.
+    """
+    digest = hashlib.sha256()
+    index = {}
+    for i, org in enumerate(levelorder_iter(tree)):
+        org = cast(Node, org)
+        index[org] = i
+        parent = index[org.parent] if org.parent is not None else -1
+        attrs = json.dumps(
+            dict(org.describe(exclude_prefix="_")), sort_keys=True, default=str
+        )
+        digest.update(f"{parent}\0{attrs}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MergeState:
+    """
+    On-disk record of the decisions made by earlier merges.
+
+    The decisions of each merge are stored as a table mapping source organizations to the base
+    organizations they were merged into, with the score. Each table is keyed by a hash of the
+    merge settings and of the fingerprints of the base tree and of every source merged up to and
+    including its own, since a merge depends on all of the merges before it. The key also covers
+    the format version and the package version, so decisions made by other code are not
+    replayed. Decisions whose key still matches can be replayed instead of scoring the source
+    again.
+
+    Attributes:
+        version (int): Format version of the decision tables, bumped whenever the merge
+            algorithm or the table columns change.
+        logger (logging.Logger): Logger object for logging messages.
+        path (str): Directory to store decision tables in.
+    """
+
+    version = 1
+
+    def __init__(self, logger: Logger, path: str) -> None:
+        self.logger = logger
+        self.path = path
+
+    def keys(
+        self, trees: List[Node], source_names: List[str], settings: List[str]
+    ) -> List[str]:
+        """
+        Return the key of each merge in a chain of merges.
+
+        Args:
+            trees (list): Base tree, followed by the source trees in merge order.
+            source_names (list): Source names for the trees.
+            settings (list): Merge settings that decisions depend on.
+
+        Returns:
+            list: Key for each source tree merged, in merge order.
+        """
+        digest = hashlib.sha256()
+        for part in [str(self.version), __version__, rapidfuzz.__version__] + settings:
+            digest.update(part.encode("utf-8") + b"\0")
+        keys = []
+        for i, (tree, source_name) in enumerate(zip(trees, source_names)):
+            digest.update(
+                (source_name + "\0" + tree_fingerprint(tree) + "\0").encode("utf-8")
+            )
+            if i > 0:
+                keys.append(digest.copy().hexdigest())
+        return keys
+
+    def entry_path(self, source_name: str, ext: str) -> str:
+        return self.path + "/" + source_name + "." + ext
+
+    def load(self, source_name: str, key: str) -> Optional[pl.DataFrame]:
+        """Load the decisions stored for a source, if they were made with the given key."""
+        try:
+            with open(self.entry_path(source_name, "json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["key"] != key:
+                return None
+            decisions = pl.read_parquet(self.entry_path(source_name, "parquet"))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        self.logger.info(f"Loaded stored {source_name} merge decisions {key[:12]}")
+        return decisions
+
+    def save(self, source_name: str, key: str, decisions: pl.DataFrame) -> None:
+        """Save the decisions made for a source with the given key."""
+        os.makedirs(self.path, exist_ok=True)
+        # Write to temporary files and rename, so a partial entry is never loaded.
+        try:
+            os.remove(self.entry_path(source_name, "json"))
+        except FileNotFoundError:
+            pass
+        decisions.write_parquet(self.entry_path(source_name, "parquet.tmp"))
+        with open(self.entry_path(source_name, "json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"key": key, "decisions": len(decisions)}, f)
+        os.replace(
+            self.entry_path(source_name, "parquet.tmp"),
+            self.entry_path(source_name, "parquet"),
+        )
+        os.replace(
+            self.entry_path(source_name, "json.tmp"),
+            self.entry_path(source_name, "json"),
+        )
@@ -1,8 +1,11 @@
 # Settings for allusgov project
 #
 
+from rapidfuzz import fuzz
+
 from .exporter import exporter
 from .importer import importer, samgov_importer, digitalregistry_importer
+from .merger import hierarchical, matcher, merger
 from .processor import normalize_name
 from .spider import (
     budget,
@@ -60,16 +63,38 @@ SOURCES = {
 EXPORTERS = {
     "text": exporter.TextExporter,
     "json": exporter.JSONExporter,
+    "ndjson": exporter.NDJSONExporter,
     "csv": exporter.CSVExporter,
     "widecsv": exporter.WideCSVExporter,
     "dot": exporter.DotExporter,
     "gexf": exporter.GEXFExporter,
     "graphml": exporter.GraphMLExporter,
     "cyjs": exporter.CytoscapeJSONExporter,
+    "parquet": exporter.ParquetExporter,
+    "arrow": exporter.ArrowExporter,
+    "sqlite": exporter.SQLiteExporter,
 }
+EXPORT_COMPRESSIONS = list(exporter.BaseExporter.compression_extensions.keys())
 
 # Merge settings
 MERGE_BASE = "samgov"
+MATCHERS = {
+    "ratio": matcher.DEFAULT_MATCHER,
+    "token_set": matcher.RapidfuzzMatcher("token_set", fuzz.token_set_ratio),
+    "wratio": matcher.RapidfuzzMatcher("wratio", fuzz.WRatio),
+    "tfidf": matcher.TfidfMatcher(),
+}
+MERGE_STRATEGIES = {
+    "flat": merger.Merger,
+    "hierarchical": hierarchical.HierarchicalMerger,
+}
+# Similarity cache, relative to DATA_DIR, and its maximum size in bytes
+SIMILARITY_CACHE_DIR = "similarity-cache"
+SIMILARITY_CACHE_SIZE = 256 * 1024 * 1024
+# Stored merge decisions, relative to DATA_DIR
+MERGE_STATE_DIR = "merge-state"
+# Merge plan written by merge --plan-only, relative to DATA_DIR
+MERGE_PLAN = "merged/merge-plan.parquet"
 
 # Directories
 DATA_DIR = "data"
@@ -1,23 +1,30 @@
+import logging
 import os
 from logging import Logger
-from typing import Optional
+from typing import List, Optional
 
 from bigtree.node.node import Node
 from scrapy.settings import Settings
 from scrapy.utils.project import get_project_settings
 
 
-def full_name(org: Optional[Node], source_name: str) -> str:
-    """Return the best full name of the organization (from the given source if it exists)."""
+def full_name(org: Optional[Node], source_name: str, field: str = "name") -> str:
+    """
+    Return the best full name of the organization (from the given source if it exists).
+
+    The name is read from the given attribute field, such as normalized_name, if present.
+    """
     if org is None:
         return ""
     # If there is a name for the requested source, return that.
     attrs = org.get_attr(source_name)
+    if attrs and field in attrs:
+        return attrs[field]
     if attrs and "name" in attrs:
         return attrs["name"]
     # Otherwise, return the first name attribute found form any source.
     attrs = org.describe(exclude_prefix="_", exclude_attributes=["name"])
-    return attrs[0][1]["name"]
+    return attrs[0][1].get(field, attrs[0][1]["name"])
 
 
 def spider_uri_params(params, spider):
@@ -55,3 +62,23 @@ def scrapy_spider_closed(results):
         results.append((spider.name, reason))
 
     return callback
+
+
+class LogRecordCollector(logging.Handler):
+    """
+    Collect log records in memory so they can be replayed by another process.
+
+    Messages are formatted on arrival, so that the records can be pickled.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
@@ -1,5 +1,66 @@
 """Integration tests configuration file."""
 
-# pylint: disable=unused-import
+# pylint: disable=unused-import,redefined-outer-name
+
+import random
+from typing import Any, Dict
+
+import pytest
+from bigtree import Node
 
 from allusgov.tests.conftest import pytest_configure
+
+# Few words, so that random names are often similar or repeated.
+WORDS = ["office", "bureau", "of", "the", "defense", "energy", "health", "labor"]
+
+
+@pytest.fixture
+def rng():
+    return random.Random(0)
+
+
+@pytest.fixture
+def random_name(rng):
+    """Return a function making random lowercase names of up to the given number of words."""
+
+    def make(max_words=4):
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, max_words)))
+
+    return make
+
+
+@pytest.fixture
+def random_tree(rng, random_name):
+    """Return a function making a tree of organizations with random titled names."""
+
+    def make(source_name, size, max_words=3):
+        root_attrs: Dict[str, Any] = {source_name: {"name": "ROOT"}}
+        root = Node("US FEDERAL GOVERNMENT", **root_attrs)
+        nodes = [root]
+        for i in range(size):
+            name = random_name(max_words).title()
+            attrs: Dict[str, Any] = {source_name: {"name": name}}
+            nodes.append(Node(f"{name} ({i})", parent=rng.choice(nodes), **attrs))
+        return root
+
+    return make
+
+
+@pytest.fixture
+def path_tree():
+    """Return a function making a tree of organizations from their paths below the root."""
+
+    def make(source_name, paths):
+        root_attrs: Dict[str, Any] = {source_name: {"name": "ROOT"}}
+        root = Node("ROOT", **root_attrs)
+        for path in paths:
+            parent = root
+            for name in path.split("/"):
+                children = {child.name: child for child in parent.children}
+                if name not in children:
+                    attrs: Dict[str, Any] = {source_name: {"name": name}}
+                    children[name] = Node(name, parent=parent, **attrs)
+                parent = children[name]
+        return root
+
+    return make
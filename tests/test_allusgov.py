@@ -0,0 +1,239 @@
+"""Tests for the build, merge and export commands."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import functools
+import logging
+import os
+import re
+
+import polars as pl
+import pytest
+from bigtree import tree_to_dict
+from expecter import expect
+
+from allusgov import allusgov, settings
+from allusgov.cli_options import logger
+from allusgov.importer.synthetic_importer import SyntheticImporter
+from allusgov.utils.utils import LogRecordCollector
+
+SOURCES = ["base", "source", "other"]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def trees(random_tree):
+    """Return a function making fresh copies of the same source trees, as merges change them."""
+    originals = {
+        "base": random_tree("base", 60),
+        "source": random_tree("source", 40),
+        "other": random_tree("other", 30),
+    }
+
+    def make():
+        return {source: tree.copy() for source, tree in originals.items()}
+
+    return make
+
+
+@pytest.fixture
+def scoped_trees(path_tree):
+    """Return trees that the flat and hierarchical strategies merge differently."""
+    return {
+        "base": path_tree(
+            "base", ["Labor Board/Office of Safety", "Labor/Programs/Offices of Safety"]
+        ),
+        "source": path_tree("source", ["Labor/Office of Safety", "Labor/Programs"]),
+        "other": path_tree("other", ["Labor Board/Office", "Health/Office of Safety"]),
+    }
+
+
+@pytest.fixture
+def synthetic_sources(monkeypatch):
+    """Register synthetic sources of different sizes, returning their names."""
+    sources = {
+        f"synthetic-{seed}": {
+            "importer": functools.partial(SyntheticImporter, size=size, seed=seed)
+        }
+        for seed, size in enumerate([300, 50, 200])
+    }
+    monkeypatch.setattr(settings, "SOURCES", {**settings.SOURCES, **sources})
+    return list(sources)
+
+
+@pytest.fixture
+def log_records():
+    """Collect the records logged by allusgov at INFO level and above."""
+    collector = LogRecordCollector()
+    level = logger.level
+    logger.addHandler(collector)
+    logger.setLevel(logging.INFO)
+    yield collector.records
+    logger.removeHandler(collector)
+    logger.setLevel(level)
+
+
+def exported_files(path):
+    """Return the contents of every file under a directory, by relative path."""
+    files = {}
+    for directory, _, names in os.walk(path):
+        for name in names:
+            with open(os.path.join(directory, name), "rb") as f:
+                files[os.path.relpath(os.path.join(directory, name), path)] = f.read()
+    return files
+
+
+def merge(tree, **kwargs):
+    options = {"merge_threshold": 80, "merge_cache": False, "merge_incremental": False}
+    return allusgov.merge(
+        SOURCES,
+        "base",
+        exporters=[],
+        to_export=False,
+        tree=tree,
+        **{**options, **kwargs},
+    )
+
+
+def describe_build():
+    def it_exports_the_same_files_with_jobs_as_serially(
+        tmp_path, monkeypatch, synthetic_sources, log_records
+    ):
+        outputs = {}
+        messages = {}
+        built = {}
+        for jobs in [1, 3]:
+            monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path / f"jobs-{jobs}"))
+            del log_records[:]
+
+            # Parquet is left out, as polars deadlocks in workers forked after it has run.
+            trees = allusgov.build(
+                synthetic_sources, ["json", "csv", "gexf"], to_export=True, jobs=jobs
+            )
+
+            expect(list(trees)) == synthetic_sources
+            built[jobs] = [
+                tree_to_dict(tree, all_attrs=True) for tree in trees.values()
+            ]
+            outputs[jobs] = exported_files(tmp_path / f"jobs-{jobs}")
+            # Timings differ between runs.
+            messages[jobs] = [
+                re.sub(r"[0-9.]+s\b", "", record.getMessage()) for record in log_records
+            ]
+            processes = {record.process for record in log_records}
+        expect(built[3]) == built[1]
+        expect(len(outputs[1])) > 0
+        expect(outputs[3]) == outputs[1]
+        # Worker logs are replayed in source order, as a serial build logs them.
+        expect(messages[3]) == messages[1]
+        expect(messages[1]).contains("Constructing the synthetic-1 tree...")
+        expect(processes).does_not_contain(os.getpid())
+
+
+def describe_merge():
+    def describe_plan():
+        def it_applies_a_plan_as_a_merge(data_dir, trees):
+            merge(trees(), plan_only=True)
+            plan_path = str(data_dir / settings.MERGE_PLAN)
+
+            applied = merge(trees(), apply_plan=plan_path)
+
+            merged = merge(trees())
+            expect(tree_to_dict(applied, all_attrs=True)) == tree_to_dict(
+                merged, all_attrs=True
+            )
+            expect(pl.read_parquet(plan_path)["merged"].any()) == True
+
+        def it_leaves_no_stored_decisions_when_planning(data_dir, trees):
+            merge(trees(), plan_only=True, merge_incremental=True)
+
+            expect((data_dir / settings.MERGE_PLAN).exists()) == True
+            expect((data_dir / settings.MERGE_STATE_DIR).exists()) == False
+
+        def it_rejects_a_plan_for_other_trees(data_dir, trees):
+            merge(trees(), plan_only=True)
+            tree = trees()
+            tree["source"].children[0].set_attrs({"source": {"name": "Renamed"}})
+
+            with pytest.raises(SystemExit) as exit_info:
+                merge(tree, apply_plan=str(data_dir / settings.MERGE_PLAN))
+
+            expect(exit_info.value.code) == 11
+
+        def it_rejects_a_plan_for_other_settings(data_dir, trees):
+            merge(trees(), plan_only=True)
+
+            with pytest.raises(SystemExit) as exit_info:
+                merge(
+                    trees(),
+                    merge_threshold=90,
+                    apply_plan=str(data_dir / settings.MERGE_PLAN),
+                )
+
+            expect(exit_info.value.code) == 11
+
+    def describe_sweep():
+        def it_writes_the_summary_of_each_source_and_threshold(data_dir, trees):
+            tree = trees()
+
+            merge(tree, threshold_sweep=[80, 90])
+
+            summary = pl.read_csv(data_dir / "merged/threshold-sweep.csv")
+            expect(summary.columns) == [
+                "threshold",
+                "source",
+                "matches",
+                "nodes_added",
+                "seconds",
+                "merged_nodes",
+            ]
+            expect(summary.select("threshold", "source").rows()) == [
+                (80, "source"),
+                (80, "other"),
+                (90, "source"),
+                (90, "other"),
+            ]
+            base_nodes = len(list(tree["base"].descendants)) + 1
+            for threshold in [80, 90]:
+                rows = summary.filter(pl.col("threshold") == threshold)
+                expect(rows["merged_nodes"].to_list()) == (
+                    (rows["nodes_added"].cum_sum() + base_nodes).to_list()
+                )
+            expect(summary["matches"].min()) > 0
+
+        @pytest.mark.parametrize("strategy", ["flat", "hierarchical"])
+        def it_decides_as_the_merge_strategy_at_each_threshold(
+            data_dir, scoped_trees, strategy
+        ):
+            tree = scoped_trees
+
+            merge(tree, threshold_sweep=[90, 80], merge_strategy=strategy)
+
+            decisions = pl.read_parquet(
+                data_dir / "merged/threshold-sweep-decisions.parquet"
+            )
+            for source in ["source", "other"]:
+                for threshold in [80, 90]:
+                    plan = settings.MERGE_STRATEGIES[strategy](
+                        logging.getLogger(__name__),
+                        tree["base"],
+                        "base",
+                        tree[source],
+                        source,
+                        threshold,
+                    ).plan()
+                    rows = decisions.filter(
+                        (pl.col("source") == source)
+                        & (pl.col("threshold") == threshold)
+                    )
+                    expect(
+                        sorted(rows.select("source_path", "base_path", "merged").rows())
+                    ) == sorted(
+                        (source_org.path_name, selection.path_name, score > threshold)
+                        for source_org, selection, score in plan
+                    )
@@ -0,0 +1,376 @@
+"""Tests for exporting trees."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+
+import networkx as nx
+import polars as pl
+import pytest
+from bigtree import Node, tree_to_dict, tree_to_nested_dict
+from expecter import expect
+
+from allusgov import allusgov, settings
+from allusgov.exporter.exporter import (
+    ExportManifest,
+    ExportSession,
+    GEXFExporter,
+    GraphMLExporter,
+    JSONExporter,
+    NDJSONExporter,
+    ParquetExporter,
+    SQLiteExporter,
+)
+
+
+@pytest.fixture
+def tree():
+    root = Node("ROOT", test={"name": "ROOT"})
+    office = Node(
+        "Office & Co",
+        parent=root,
+        test={"name": "Office & Co", "id": 1, "active": True},
+        other={"name": "Office <and> Co", "budget": 2.5},
+    )
+    Node(
+        "Bureau",
+        parent=office,
+        test={"name": "Bureau", "tags": ["x", "y"], "note": 'say "hi"\n\tthen go'},
+    )
+    unit = Node("Unité", parent=office, test={"name": "Unité", "id": 2})
+    Node("Team", parent=unit, test={"name": "Team", "note": None})
+    Node("Agency", parent=root, other={"name": "Agency", "id": 3})
+    return root
+
+
+@pytest.fixture
+def repeated_paths():
+    root = Node("ROOT", test={"name": "ROOT"})
+    office = Node("Office", parent=root, test={"name": "Office"})
+    Node("A/B", parent=office, test={"name": "A/B"})
+    unit = Node("A", parent=office, test={"name": "A"})
+    Node("B", parent=unit, test={"name": "B", "id": 2})
+    return root
+
+
+def export(exporter_class, tree, data_dir, **kwargs):
+    exporter = exporter_class(
+        logging.getLogger(__name__), "test", tree, str(data_dir), **kwargs
+    )
+    exporter.export()
+    exporter.commit()
+    return exporter
+
+
+def read(data_dir, file):
+    with open(data_dir / "test" / file, "r", encoding="utf8") as f:
+        return f.read()
+
+
+def describe_json_exporter():
+    def it_writes_the_flat_json_of_json_dump(tree, tmp_path):
+        export(JSONExporter, tree, tmp_path)
+
+        expect(read(tmp_path, "test-flat.json")) == json.dumps(
+            tree_to_dict(tree, all_attrs=True), indent=2, sort_keys=True
+        )
+
+    def it_writes_the_nested_json_of_json_dump(tree, tmp_path):
+        export(JSONExporter, tree, tmp_path)
+
+        expect(read(tmp_path, "test-tree.json")) == json.dumps(
+            tree_to_nested_dict(tree, all_attrs=True), indent=2, sort_keys=True
+        )
+
+
+def describe_ndjson_exporter():
+    def it_writes_each_flat_json_organization_on_a_line(tree, tmp_path):
+        export(NDJSONExporter, tree, tmp_path)
+
+        lines = read(tmp_path, "test.ndjson").splitlines()
+        expected = tree_to_dict(tree, all_attrs=True)
+        expect(len(lines)) == len(expected)
+        for line, path in zip(lines, sorted(expected)):
+            expect(json.loads(line)) == dict(expected[path], path=path)
+            expect(line) == json.dumps(json.loads(line), sort_keys=True)
+
+
+def expect_networkx_gexf(tree, data_dir):
+    export(GEXFExporter, tree, data_dir)
+
+    nx.write_gexf(ExportSession(tree).build_graph(), data_dir / "expected.gexf")
+    expected = (data_dir / "expected.gexf").read_text(encoding="utf8")
+    expect(read(data_dir, "test.gexf")) == re.sub(
+        ' lastmodifieddate="[^"]*"', "", expected
+    )
+
+
+def expect_networkx_graphml(tree, data_dir):
+    export(GraphMLExporter, tree, data_dir)
+
+    nx.write_graphml(ExportSession(tree).build_graph(), data_dir / "expected.graphml")
+    expect(read(data_dir, "test.graphml")) == (data_dir / "expected.graphml").read_text(
+        encoding="utf8"
+    )
+
+
+def describe_gexf_exporter():
+    def it_writes_the_gexf_of_networkx_without_a_date(tree, tmp_path):
+        expect_networkx_gexf(tree, tmp_path)
+
+    def it_writes_organizations_with_the_same_path_as_one_node(
+        repeated_paths, tmp_path
+    ):
+        expect_networkx_gexf(repeated_paths, tmp_path)
+
+        expect(read(tmp_path, "test.gexf").count("<node ")) == 4
+        expect(read(tmp_path, "test.gexf").count("<edge ")) == 4
+
+
+def describe_graphml_exporter():
+    def it_writes_the_graphml_of_networkx(tree, tmp_path):
+        expect_networkx_graphml(tree, tmp_path)
+
+    def it_writes_organizations_with_the_same_path_as_one_node(
+        repeated_paths, tmp_path
+    ):
+        expect_networkx_graphml(repeated_paths, tmp_path)
+
+        expect(read(tmp_path, "test.graphml").count("<node ")) == 4
+        expect(read(tmp_path, "test.graphml").count("<edge ")) == 4
+
+
+def describe_parquet_exporter():
+    def it_widens_kinds_to_hold_every_value():
+        kind = None
+        for value in [
+            {"id": 1, "tags": ["x"], "flag": True},
+            {"id": 2.5, "tags": [], "extra": None},
+            {"id": 3, "tags": None, "flag": "yes", "size": 2**70},
+        ]:
+            kind = ParquetExporter.widen(kind, value)
+
+        expect(kind) == {
+            "id": "float",
+            "tags": ["str"],
+            "flag": "str",
+            "extra": None,
+            "size": "str",
+        }
+        expect(ParquetExporter.widen("int", [1])) == "str"
+
+    def it_coerces_values_to_their_kind():
+        kind = ParquetExporter.widen(
+            ParquetExporter.widen(None, {1: "a", "b": [1]}), {"b": {"c": 2}}
+        )
+
+        expect(ParquetExporter.coerce({1: "a", "b": [1]}, kind)) == {
+            "1": "a",
+            "b": "[1]",
+        }
+        expect(ParquetExporter.coerce({"b": {"c": 2}}, kind)) == {
+            "1": None,
+            "b": '{"c": 2}',
+        }
+        expect(ParquetExporter.coerce({}, kind)) == None
+
+    def it_writes_nested_attributes_as_struct_and_list_columns(tree, tmp_path):
+        export(ParquetExporter, tree, tmp_path)
+
+        df = pl.read_parquet(tmp_path / "test" / "test.parquet")
+        expect(df.columns) == ["path", "name", "parent_path", "depth", "test", "other"]
+        expect(df.schema["test"]) == pl.Struct(
+            [
+                pl.Field("name", pl.Utf8),
+                pl.Field("id", pl.Int64),
+                pl.Field("active", pl.Boolean),
+                pl.Field("tags", pl.List(pl.Utf8)),
+                pl.Field("note", pl.Utf8),
+            ]
+        )
+        expect(df.schema["other"]) == pl.Struct(
+            [
+                pl.Field("name", pl.Utf8),
+                pl.Field("budget", pl.Float64),
+                pl.Field("id", pl.Int64),
+            ]
+        )
+        rows = {row["path"]: row for row in df.to_dicts()}
+        expect(rows["/ROOT/Office & Co/Bureau"]["test"]["tags"]) == ["x", "y"]
+        expect(rows["/ROOT/Office & Co"]["other"]["budget"]) == 2.5
+        expect(rows["/ROOT/Agency"]["test"]) == None
+
+
+def describe_sqlite_exporter():
+    def it_keeps_organizations_with_the_same_path(repeated_paths, tmp_path):
+        export(SQLiteExporter, repeated_paths, tmp_path)
+
+        conn = sqlite3.connect(tmp_path / "test" / "test.sqlite")
+        try:
+            paths = conn.execute(
+                "SELECT name FROM nodes WHERE path = ? ORDER BY id",
+                ["/ROOT/Office/A/B"],
+            ).fetchall()
+            closure = conn.execute("SELECT COUNT(*) FROM closure").fetchone()
+        finally:
+            conn.close()
+
+        expect(paths) == [("A/B",), ("B",)]
+        # Each organization has one row per ancestor, itself included.
+        expect(closure) == (1 + 2 + 3 + 3 + 4,)
+
+
+def describe_export_manifest():
+    def it_is_current_for_the_same_key_while_the_files_exist(tree, tmp_path):
+        export(JSONExporter, tree, tmp_path)
+        manifest = ExportManifest(str(tmp_path), "test")
+        key = ExportManifest.key("tree", "json", JSONExporter)
+        manifest.record("json", key, {"test-flat.json": "", "test-tree.json": ""})
+        manifest.save()
+
+        manifest = ExportManifest(str(tmp_path), "test")
+        expect(manifest.is_current("json", key)) == True
+        expect(manifest.is_current("json", "other")) == False
+        expect(manifest.is_current("ndjson", key)) == False
+        os.remove(tmp_path / "test" / "test-tree.json")
+        expect(manifest.is_current("json", key)) == False
+
+    def it_has_a_key_for_each_tree_and_compression():
+        key = ExportManifest.key("tree", "json", JSONExporter)
+
+        expect(ExportManifest.key("tree", "json", JSONExporter)) == key
+        expect(ExportManifest.key("other", "json", JSONExporter)) != key
+        expect(ExportManifest.key("tree", "json", JSONExporter, "gzip")) != key
+
+    def it_returns_the_files_no_longer_written(tmp_path):
+        manifest = ExportManifest(str(tmp_path), "test")
+
+        expect(manifest.record("json", "a", {"test-flat.json": "1"})) == []
+        expect(manifest.record("json", "b", {"test-flat.json.gz": "2"})) == [
+            "test-flat.json"
+        ]
+        expect(manifest.file_hash("test-flat.json.gz")) == "2"
+        expect(manifest.file_hash("test-flat.json")) == None
+
+
+def describe_commit():
+    def it_leaves_files_with_the_recorded_hash_untouched(tree, tmp_path):
+        manifest = ExportManifest(str(tmp_path), "test")
+        exporter = NDJSONExporter(
+            logging.getLogger(__name__), "test", tree, str(tmp_path)
+        )
+        exporter.export()
+        manifest.record("ndjson", "a", exporter.commit(manifest))
+        path = tmp_path / "test" / "test.ndjson"
+        os.utime(path, (0, 0))
+
+        exporter.export()
+        files = exporter.commit(manifest)
+
+        expect(files) == manifest.exporters["ndjson"]["files"]
+        expect(os.stat(path).st_mtime) == 0
+        expect(sorted(os.listdir(tmp_path / "test"))) == ["test.ndjson"]
+
+    def it_replaces_files_whose_contents_changed(tree, tmp_path):
+        manifest = ExportManifest(str(tmp_path), "test")
+        exporter = NDJSONExporter(
+            logging.getLogger(__name__), "test", tree, str(tmp_path)
+        )
+        exporter.export()
+        manifest.record("ndjson", "a", exporter.commit(manifest))
+        path = tmp_path / "test" / "test.ndjson"
+        os.utime(path, (0, 0))
+        Node("Office", parent=tree, test={"name": "Office"})
+
+        exporter.export()
+        files = exporter.commit(manifest)
+
+        expect(files) != manifest.exporters["ndjson"]["files"]
+        expect(os.stat(path).st_mtime) != 0
+        expect(read(tmp_path, "test.ndjson")).contains('"name": "Office"')
+
+
+def describe_discard():
+    def it_removes_the_temporary_files(tree, tmp_path):
+        exporter = JSONExporter(
+            logging.getLogger(__name__), "test", tree, str(tmp_path)
+        )
+        exporter.export()
+        expect(len(os.listdir(tmp_path / "test"))) == 2
+
+        exporter.discard()
+
+        expect(os.listdir(tmp_path / "test")) == []
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def decompress(path):
+    with open(path, "rb") as f:
+        if path.suffix == ".gz":
+            return gzip.decompress(f.read())
+        if path.suffix == ".zst":
+            import zstandard  # pylint: disable=import-outside-toplevel
+
+            return zstandard.ZstdDecompressor().stream_reader(f).read()
+        return f.read()
+
+
+def describe_compression():
+    @pytest.mark.parametrize("compression,ext", [("gzip", ".gz"), ("zstd", ".zst")])
+    def it_writes_the_uncompressed_export_compressed(tree, data_dir, compression, ext):
+        exporters = ["text", "json", "ndjson", "gexf", "sqlite"]
+        allusgov.export("test", tree, exporters)
+        plain = {
+            file: (data_dir / "test" / file).read_bytes()
+            for file in os.listdir(data_dir / "test")
+            if not file.endswith(".manifest.json")
+        }
+
+        allusgov.export("test", tree, exporters, compression=compression)
+
+        files = sorted(os.listdir(data_dir / "test"))
+        expect(files) == sorted([file + ext for file in plain] + ["test.manifest.json"])
+        for file, contents in plain.items():
+            expect(decompress(data_dir / "test" / (file + ext))) == contents
+        manifest = json.loads(read(data_dir, "test.manifest.json"))
+        expect(sorted(manifest["exporters"]["json"]["files"])) == [
+            "test-flat.json" + ext,
+            "test-tree.json" + ext,
+        ]
+
+    @pytest.mark.parametrize(
+        "compression,magic",
+        [
+            ("none", b"\x28\xb5\x2f\xfd"),
+            ("zstd", b"\x28\xb5\x2f\xfd"),
+            ("gzip", b"\x1f\x8b"),
+        ],
+    )
+    def it_compresses_parquet_pages_and_keeps_the_name(
+        tree, data_dir, compression, magic
+    ):
+        allusgov.export("test", tree, ["parquet"], compression=compression)
+
+        path = data_dir / "test" / "test.parquet"
+        expect(sorted(os.listdir(data_dir / "test"))) == [
+            "test.manifest.json",
+            "test.parquet",
+        ]
+        expect(path.read_bytes()).contains(magic)
+        expect(
+            pl.read_parquet(path).equals(
+                ParquetExporter(
+                    logging.getLogger(__name__), "test", tree, str(data_dir)
+                ).table()
+            )
+        ) == True
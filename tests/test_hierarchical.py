@@ -0,0 +1,85 @@
+"""Tests for merging source trees top down, within the subtrees of matched parents."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import logging
+
+import pytest
+from expecter import expect
+
+from allusgov.merger.hierarchical import HierarchicalMerger
+
+
+def selections(merger):
+    """Return the selected base path and score for each source path of a merger's plan."""
+    return {
+        source_org.path_name: (selection.path_name, score)
+        for source_org, selection, score in merger.plan()
+    }
+
+
+def describe_hierarchical_merger():
+    def describe_plan():
+        def it_matches_within_the_subtree_of_the_matched_parent(path_tree, caplog):
+            caplog.set_level(logging.INFO)
+            merger = HierarchicalMerger(
+                logging.getLogger(__name__),
+                path_tree("base", ["Labor/Office", "Health/Office"]),
+                "base",
+                path_tree("source", ["Labor/Office"]),
+                "source",
+                80,
+            )
+
+            selected = selections(merger)
+
+            expect(selected["/ROOT/Labor/Office"]) == ("/ROOT/Labor/Office", 100)
+            # ROOT and Labor against all 4 base names, then Office against Labor's only.
+            expect(caplog.messages).contains(
+                "Scored 9 name pairs for source, 75.0% of a full comparison"
+            )
+
+        def it_falls_back_to_the_whole_base_tree_below_the_threshold(path_tree, caplog):
+            caplog.set_level(logging.INFO)
+            merger = HierarchicalMerger(
+                logging.getLogger(__name__),
+                path_tree("base", ["Labor/Office", "Health/Safety/Office"]),
+                "base",
+                path_tree("source", ["Labor/Safety/Office"]),
+                "source",
+                80,
+            )
+
+            selected = selections(merger)
+
+            # Safety has no candidate within Labor, so it is matched in the whole base tree,
+            # and its children are then matched within the subtree it was merged into.
+            expect(selected["/ROOT/Labor"]) == ("/ROOT/Labor", 100)
+            expect(selected["/ROOT/Labor/Safety"][0]) == "/ROOT/Health/Safety"
+            expect(selected["/ROOT/Labor/Safety"][1]) == pytest.approx(83.636, abs=1e-3)
+            expect(selected["/ROOT/Labor/Safety/Office"][0]) == (
+                "/ROOT/Health/Safety/Office"
+            )
+            expect(selected["/ROOT/Labor/Safety/Office"][1]) == pytest.approx(
+                90.909, abs=1e-3
+            )
+            expect(caplog.messages).contains(
+                "Scored 17 name pairs for source, 85.0% of a full comparison"
+            )
+
+        def it_keeps_the_best_selection_when_none_is_above_the_threshold(
+            path_tree,
+        ):
+            merger = HierarchicalMerger(
+                logging.getLogger(__name__),
+                path_tree("base", ["Labor/Office"]),
+                "base",
+                path_tree("source", ["Labor/Panel/Offices"]),
+                "source",
+                80,
+            )
+
+            selected = selections(merger)
+
+            expect(selected["/ROOT/Labor/Panel/Offices"][0]) == "/ROOT/Labor/Office"
+            expect(selected["/ROOT/Labor/Panel/Offices"][1]) <= 80
@@ -0,0 +1,56 @@
+"""Tests for building trees from source data."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import logging
+
+from bigtree import Node, nested_dict_to_tree, tree_to_nested_dict
+from expecter import expect
+
+from allusgov.importer.synthetic_importer import SyntheticImporter
+
+
+def describe_build():
+    def it_matches_the_nested_dict_tree():
+        importer = SyntheticImporter(logging.getLogger(__name__), 500)
+        tree = importer.build()
+
+        # The tree as bigtree builds it from nested dicts, with children in source order.
+        items = {item["id"]: item for item in importer.data}
+        index = importer.build_index(
+            {item_id: item["parent_id"] for item_id, item in items.items()}
+        )
+
+        def nested(item_id):
+            return {
+                "name": "[synthetic] Office " + item_id[4:] + " (" + item_id + ")",
+                "synthetic": {
+                    key: value
+                    for key, value in items[item_id].items()
+                    if key != "parent_id"
+                },
+                "children": [nested(child) for child in index.get(item_id, [])],
+            }
+
+        expected: Node = nested_dict_to_tree(
+            {
+                "name": importer.root,
+                "synthetic": {"name": importer.root},
+                "children": [nested(child) for child in index[importer.root]],
+            }
+        )
+
+        expect(tree_to_nested_dict(tree, all_attrs=True)) == tree_to_nested_dict(
+            expected, all_attrs=True
+        )
+
+    def it_builds_chains_deeper_than_the_recursion_limit():
+        tree = SyntheticImporter(logging.getLogger(__name__), 5000, chain=True).build()
+
+        depth = 0
+        node = tree
+        while len(node.children) > 0:
+            node = node.children[0]
+            depth += 1
+
+        expect(depth) == 5000
@@ -0,0 +1,42 @@
+"""Tests for the string matchers."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import numpy as np
+import pytest
+from expecter import expect
+
+from allusgov.merger.matcher import TfidfMatcher
+
+
+@pytest.fixture
+def names(random_name):
+    return [random_name() for _ in range(140)]
+
+
+def describe_tfidf_matcher():
+    def it_scores_the_matrix_as_each_pair(names):
+        matcher = TfidfMatcher().fit(names[:80])
+        queries = names[80:] + ["zoology of the navy"]
+        choices = names[:80] + ["navy zoology"]
+
+        matrix = matcher.cdist(queries, choices, 0)
+
+        rows, columns = np.indices(matrix.shape)
+        expect(matrix.ravel().tolist()) == pytest.approx(
+            matcher.cpdist(
+                [queries[row] for row in rows.ravel()],
+                [choices[column] for column in columns.ravel()],
+            ).tolist(),
+            abs=1e-4,
+        )
+        expect(matrix[-1, -1]) > 0
+
+    def it_does_not_add_unseen_ngrams_to_the_vocabulary(names):
+        matcher = TfidfMatcher().fit(names)
+        vocabulary = dict(matcher.vocabulary)
+
+        matcher.cdist(["zoology"], ["navy zoology"], 0)
+        matcher.cpdist(["zoology"], ["navy zoology"])
+
+        expect(matcher.vocabulary) == vocabulary
@@ -0,0 +1,294 @@
+"""Tests for merging source trees into a base tree."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import logging
+
+import pytest
+from bigtree import levelorder_iter, preorder_iter, tree_to_dict
+from expecter import expect
+
+from allusgov.merger.merger import Merger
+from allusgov.utils.utils import full_name
+
+
+@pytest.fixture
+def merger(random_tree):
+    return Merger(
+        logging.getLogger(__name__),
+        random_tree("base", 120),
+        "base",
+        random_tree("source", 80),
+        "source",
+        80,
+    )
+
+
+def expected_plan(merger):
+    """Return the decisions of process_candidates for each organization, in merge order."""
+    plan = []
+    for source_org in reversed(list(levelorder_iter(merger.source_tree))):
+        candidates = merger.get_candidates(full_name(source_org, "source"))
+        if len(candidates) > 0:
+            plan.append(
+                (source_org, *merger.process_candidates(candidates, source_org))
+            )
+    return plan
+
+
+def apply_one_by_one(decisions, threshold):
+    """Apply decisions as merge did before apply_all, moving each child as it is reached."""
+    for source_org, selection, score in decisions:
+        if score > threshold:
+            selection.set_attrs({"source": source_org.get_attr("source")})
+            for child in list(source_org.children):
+                child.parent = selection
+
+
+def shape(tree):
+    """Return the path and attributes of every organization of a tree, in preorder."""
+    return [
+        (org.path_name, org.get_attr("base"), org.get_attr("source"))
+        for org in preorder_iter(tree)
+    ]
+
+
+def copy_decisions(decisions, merger, base_tree, source_tree):
+    """Return the same decisions between copies of the trees of a merger."""
+    base_orgs = list(levelorder_iter(base_tree))
+    source_orgs = list(levelorder_iter(source_tree))
+    return [
+        (
+            source_orgs[merger.source_index[source_org]],
+            base_orgs[merger.base_index[selection]],
+            score,
+        )
+        for source_org, selection, score in decisions
+    ]
+
+
+def plan_indexes(merger):
+    """Return the plan of a merger, with organizations as level order positions."""
+    return [
+        (merger.source_index[source_org], merger.base_index[selection], score)
+        for source_org, selection, score in merger.plan()
+    ]
+
+
+def expect_same_plan_without_fast_path(merger, monkeypatch):
+    """Check that a merger plans the same without resolving exact matches first."""
+    full_scan = Merger(
+        logging.getLogger(__name__),
+        merger.base_tree.copy(),
+        merger.base_name,
+        merger.source_tree.copy(),
+        merger.source_name,
+        merger.threshold,
+    )
+    monkeypatch.setattr(full_scan, "resolve_exact", lambda source_orgs: {})
+
+    plan = plan_indexes(merger)
+    expected = plan_indexes(full_scan)
+
+    expect([decision[:2] for decision in plan]) == [
+        decision[:2] for decision in expected
+    ]
+    expect([decision[2] for decision in plan]) == pytest.approx(
+        [decision[2] for decision in expected]
+    )
+
+
+def nested_decisions(base, source):
+    """Return decisions between the trees of the nested fixture, in merge order."""
+
+    def org(tree, path):
+        return next(o for o in preorder_iter(tree) if o.path_name == path)
+
+    return [
+        # A nested source organization, merged below its parent's selection.
+        (
+            org(source, "/ROOT/Agency/Office"),
+            org(base, "/ROOT/Department/Division/Team"),
+            90,
+        ),
+        # Two source organizations merged into the same base organization.
+        (org(source, "/ROOT/Agency"), org(base, "/ROOT/Department"), 100),
+        (org(source, "/ROOT/Bureau"), org(base, "/ROOT/Department"), 85),
+        (org(source, "/ROOT/Panel"), org(base, "/ROOT/Commission"), 60),
+        (org(source, "/ROOT"), org(base, "/ROOT"), 100),
+    ]
+
+
+def describe_merger():
+    def describe_select_candidates():
+        def it_matches_process_candidates_for_each_organization(merger):
+            source_orgs = list(levelorder_iter(merger.source_tree))
+
+            selected = merger.select_candidates(source_orgs)
+
+            expected = {}
+            for source_org in source_orgs:
+                candidates = merger.get_candidates(full_name(source_org, "source"))
+                if len(candidates) > 0:
+                    expected[source_org] = merger.process_candidates(
+                        candidates, source_org
+                    )
+            expect(len(expected)) > 0
+            expect(set(selected)) == set(expected)
+            for source_org, (selection, score) in expected.items():
+                expect(selected[source_org][0]) == selection
+                expect(selected[source_org][1]) == pytest.approx(score)
+
+    def describe_plan():
+        @pytest.fixture
+        def exact(path_tree):
+            """
+            Trees with duplicate exact names, told apart by their ancestors or tied.
+
+            Office has exact matches under two parents, office two exact matches under the same
+            parent, Bureau of Energy a single exact match under the wrong parent, and Team as
+            many exact matches as the candidate limit, under equally similar parents.
+            """
+            teams = ["Team", "TEAM", "team", "tEAM", "TeaM"]
+            base = path_tree(
+                "base",
+                ["Health/Office", "Labor/Office", "Labor/OFFICE"]
+                + ["Energy/Bureau of Energy", "Defense/Bureau of Energies"]
+                + [f"Panel {panel}/{team}" for panel, team in zip("ABCDE", teams)],
+            )
+            source = path_tree(
+                "source",
+                ["Health/Office", "Labor/office", "Defense/Bureau of Energy"]
+                + ["Panel F/Team"],
+            )
+            return base, source
+
+        def it_decides_as_process_candidates_in_merge_order(merger):
+            expected = expected_plan(merger)
+
+            plan = merger.plan()
+
+            expect(len(plan)) == len(expected)
+            for (source_org, selection, score), decision in zip(plan, expected):
+                expect((source_org, selection)) == decision[:2]
+                expect(score) == pytest.approx(decision[2])
+
+        def it_decides_the_same_without_the_exact_match_fast_path(merger, monkeypatch):
+            expect(len(merger.resolve_exact(list(merger.source_index)))) > 0
+
+            expect_same_plan_without_fast_path(merger, monkeypatch)
+
+        def it_decides_the_same_for_exact_matches_the_fast_path_skips(
+            exact, monkeypatch
+        ):
+            base, source = exact
+            merger = Merger(
+                logging.getLogger(__name__), base, "base", source, "source", 80
+            )
+
+            resolved = merger.resolve_exact(list(merger.source_index))
+
+            expect(sorted(source_org.path_name for source_org in resolved)) == [
+                "/ROOT",
+                "/ROOT/Defense",
+                "/ROOT/Health",
+                "/ROOT/Health/Office",
+                "/ROOT/Labor",
+                "/ROOT/Labor/office",
+                "/ROOT/Panel F/Team",
+            ]
+            expect_same_plan_without_fast_path(merger, monkeypatch)
+            selections = {
+                source_org.path_name: selection.path_name
+                for source_org, selection, _ in merger.plan()
+            }
+            expect(selections["/ROOT/Health/Office"]) == "/ROOT/Health/Office"
+            expect(selections["/ROOT/Defense/Bureau of Energy"]) == (
+                "/ROOT/Defense/Bureau of Energies"
+            )
+
+        def it_does_not_change_either_tree(merger):
+            base = tree_to_dict(merger.base_tree, all_attrs=True)
+            source = tree_to_dict(merger.source_tree, all_attrs=True)
+
+            merger.plan()
+
+            expect(tree_to_dict(merger.base_tree, all_attrs=True)) == base
+            expect(tree_to_dict(merger.source_tree, all_attrs=True)) == source
+
+    def describe_decision_table():
+        def it_describes_each_decision_of_a_plan(merger):
+            plan = merger.plan()
+            source_orgs = list(levelorder_iter(merger.source_tree))
+            base_orgs = list(levelorder_iter(merger.base_tree))
+
+            table = merger.decision_table(plan)
+
+            expect(len(table)) == len(plan)
+            for row, (source_org, selection, score) in zip(
+                table.iter_rows(named=True), plan
+            ):
+                expect(source_orgs[row["source_index"]]) == source_org
+                expect(row["source_path"]) == source_org.path_name
+                expect(base_orgs[row["base_index"]]) == selection
+                expect(row["base_path"]) == selection.path_name
+                expect(row["name_score"]) == pytest.approx(
+                    merger.similarity.score(
+                        full_name(source_org, "source"), full_name(selection, "base")
+                    )
+                )
+                expect(row["name_score"] + row["ancestor_contribution"]) == (
+                    pytest.approx(score)
+                )
+                expect(row["merged"]) == (score > 80)
+            expect(table["merged"].any()) == True
+
+        def it_records_the_decisions_applied(merger):
+            plan = merger.plan()
+            expected = merger.decision_table(plan)
+
+            merger.apply_all(plan)
+
+            expect(merger.decision_table().equals(expected)) == True
+
+    def describe_apply_all():
+        @pytest.fixture
+        def nested(path_tree):
+            base = path_tree("base", ["Department/Division/Team", "Commission"])
+            source = path_tree(
+                "source",
+                ["Agency/Office/Unit", "Agency/Office/Group", "Agency/Desk"]
+                + ["Bureau/Branch", "Panel/Cell"],
+            )
+            return base, source
+
+        def it_matches_moving_children_one_by_one(nested):
+            base, source = nested
+            expected_base, expected_source = base.copy(), source.copy()
+            merger = Merger(
+                logging.getLogger(__name__), base, "base", source, "source", 80
+            )
+
+            merger.apply_all(nested_decisions(base, source))
+
+            apply_one_by_one(nested_decisions(expected_base, expected_source), 80)
+            expect(shape(base)) == shape(expected_base)
+            expect(shape(source)) == shape(expected_source)
+            expect(
+                [c.path_name for c in base.children[0].children[0].children[0].children]
+            ) == [
+                "/ROOT/Department/Division/Team/Unit",
+                "/ROOT/Department/Division/Team/Group",
+            ]
+
+        def it_matches_moving_children_one_by_one_for_a_plan(merger):
+            plan = merger.plan()
+            base, source = merger.base_tree.copy(), merger.source_tree.copy()
+            decisions = copy_decisions(plan, merger, base, source)
+            expect(len({selection for _, selection, _ in plan})) < len(plan)
+
+            merger.apply_all(plan)
+
+            apply_one_by_one(decisions, merger.threshold)
+            expect(shape(merger.base_tree)) == shape(base)
+            expect(shape(merger.source_tree)) == shape(source)
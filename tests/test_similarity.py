@@ -0,0 +1,106 @@
+"""Tests for the sparse top-k string similarity."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import pytest
+from expecter import expect
+from rapidfuzz import process, utils
+
+from allusgov.merger.similarity import ProcessedNames, Similarity
+
+
+@pytest.fixture
+def names(random_name):
+    """Return distinct source and base names."""
+    source_names = list(dict.fromkeys(random_name().title() for _ in range(60)))
+    base_names = list(dict.fromkeys(random_name().title() for _ in range(80)))
+    return source_names, base_names
+
+
+def dense_candidates(source_names, base_names, cutoff, limit=5):
+    """Return the top candidates from a dense cdist matrix, with ties broken by base name."""
+    matrix = process.cdist(source_names, base_names, processor=utils.default_process)
+    candidates = {}
+    for source_name, row in zip(source_names, matrix):
+        matches = sorted(
+            ((float(score), base) for base, score in zip(base_names, row)),
+            reverse=True,
+        )
+        candidates[source_name] = [
+            (base, score) for score, base in matches if score > cutoff
+        ][:limit]
+    return candidates
+
+
+def expect_dense(similarity, expected):
+    for source_name, candidates in expected.items():
+        actual = similarity.candidates(source_name)
+        expect([base for base, _ in actual]) == [base for base, _ in candidates]
+        expect([score for _, score in actual]) == pytest.approx(
+            [score for _, score in candidates], abs=1e-4
+        )
+
+
+def describe_similarity():
+    def it_keeps_the_dense_top_candidates(names):
+        source_names, base_names = names
+        similarity = Similarity(source_names, base_names, 40)
+
+        expect_dense(similarity, dense_candidates(source_names, base_names, 40))
+
+    def it_keeps_them_when_scoring_in_small_chunks(names):
+        source_names, base_names = names
+        similarity = Similarity(source_names, base_names, 40, chunk_cells=7)
+        similarity.calculate()
+
+        expect_dense(similarity, dense_candidates(source_names, base_names, 40))
+
+    def it_keeps_them_when_spilling_to_disk(names):
+        source_names, base_names = names
+        similarity = Similarity(source_names, base_names, 40, memory_limit=256)
+        similarity.calculate()
+
+        expect(similarity.spill) == True
+        expect_dense(similarity, dense_candidates(source_names, base_names, 40))
+
+    def it_keeps_them_when_rebased_on_more_base_names(names):
+        source_names, base_names = names
+        similarity = Similarity(source_names, base_names[:30], 40)
+        similarity.calculate()
+        similarity.rebase(base_names)
+
+        expect_dense(similarity, dense_candidates(source_names, base_names, 40))
+
+    def it_scores_any_pair_as_the_dense_matrix(names):
+        source_names, base_names = names
+        similarity = Similarity(source_names, base_names, 40)
+        matrix = process.cdist(
+            source_names, base_names, processor=utils.default_process
+        )
+
+        for row, column in [(0, 0), (5, 17), (-1, -1)]:
+            expect(
+                similarity.score(source_names[row], base_names[column])
+            ) == pytest.approx(float(matrix[row, column]), abs=1e-4)
+
+
+def describe_processed_names():
+    def it_processes_each_name_once(names):
+        source_names, base_names = names
+        table = ProcessedNames(Similarity(source_names, base_names, 40).matcher)
+
+        expect(table.lookup(base_names[:30])) == [
+            utils.default_process(name) for name in base_names[:30]
+        ]
+        expect(table.lookup(source_names + base_names)) == [
+            utils.default_process(name) for name in source_names + base_names
+        ]
+        expect(len(table)) == len(set(source_names + base_names))
+
+    def it_keeps_the_candidates_of_the_dense_matrix(names):
+        source_names, base_names = names
+        table = ProcessedNames(Similarity(source_names, base_names, 40).matcher)
+        table.lookup(["Déjà Vu Office"] + base_names[:30])
+        similarity = Similarity(source_names, base_names, 40, processed_names=table)
+
+        expect_dense(similarity, dense_candidates(source_names, base_names, 40))
@@ -0,0 +1,107 @@
+"""Tests for the on-disk record of merge decisions."""
+
+# pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned
+
+import logging
+
+import pytest
+from bigtree import tree_to_dict
+from expecter import expect
+
+from allusgov.merger import state
+from allusgov.merger.merger import Merger
+from allusgov.merger.state import MergeState
+
+
+@pytest.fixture
+def trees(random_tree):
+    return [
+        random_tree("base", 60),
+        random_tree("source", 40),
+        random_tree("other", 30),
+    ]
+
+
+@pytest.fixture
+def merge_state(tmp_path):
+    return MergeState(logging.getLogger(__name__), str(tmp_path / "merge-state"))
+
+
+def keys(merge_state, trees):
+    return merge_state.keys(trees, ["base", "source", "other"], ["flat", "80"])
+
+
+def describe_merge_state():
+    def describe_keys():
+        def it_keys_each_merge_of_a_chain(merge_state, trees):
+            expect(len(set(keys(merge_state, trees)))) == 2
+            expect(keys(merge_state, trees)) == keys(merge_state, trees)
+
+        def it_changes_later_keys_with_the_earlier_trees(merge_state, trees):
+            expected = keys(merge_state, trees)
+
+            trees[1].children[0].set_attrs({"source": {"name": "Renamed"}})
+
+            changed = keys(merge_state, trees)
+            expect(changed[0]) != expected[0]
+            expect(changed[1]) != expected[1]
+
+        def it_changes_with_the_format_version(merge_state, trees, monkeypatch):
+            expected = keys(merge_state, trees)
+
+            monkeypatch.setattr(MergeState, "version", MergeState.version + 1)
+
+            changed = keys(merge_state, trees)
+            expect(set(changed) & set(expected)) == set()
+
+        def it_changes_with_the_package_version(merge_state, trees, monkeypatch):
+            expected = keys(merge_state, trees)
+
+            monkeypatch.setattr(state, "__version__", "0.0.0")
+
+            changed = keys(merge_state, trees)
+            expect(set(changed) & set(expected)) == set()
+
+    def describe_load():
+        def it_replays_decisions_saved_with_the_same_key(merge_state, trees):
+            base, source = trees[0].copy(), trees[1].copy()
+            key = keys(merge_state, trees)[0]
+            merger = Merger(
+                logging.getLogger(__name__), trees[0], "base", trees[1], "source", 80
+            )
+            merged = merger.merge()
+            merge_state.save("source", key, merger.decision_table())
+
+            decisions = merge_state.load("source", key)
+
+            expect(decisions.equals(merger.decision_table())) == True
+            expect(decisions["merged"].any()) == True
+            replayed = Merger(
+                logging.getLogger(__name__), base, "base", source, "source", 80
+            ).replay(decisions)
+            expect(tree_to_dict(replayed, all_attrs=True)) == tree_to_dict(
+                merged, all_attrs=True
+            )
+
+        def it_ignores_decisions_saved_with_another_key(merge_state, trees):
+            key = keys(merge_state, trees)[0]
+            merger = Merger(
+                logging.getLogger(__name__), trees[0], "base", trees[1], "source", 80
+            )
+            merger.merge()
+            merge_state.save("source", key, merger.decision_table())
+
+            expect(merge_state.load("source", key[::-1])) == None
+
+        def it_ignores_decisions_saved_by_another_format_version(
+            merge_state, trees, monkeypatch
+        ):
+            key = keys(merge_state, trees)[0]
+            merger = Merger(
+                logging.getLogger(__name__), trees[0], "base", trees[1], "source", 80
+            )
+            merger.merge()
+            merge_state.save("source", key, merger.decision_table())
+            monkeypatch.setattr(MergeState, "version", MergeState.version + 1)
+
+            expect(merge_state.load("source", keys(merge_state, trees)[0])) == None